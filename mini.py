@@ -30,24 +30,26 @@ USAGE = f"""{BRIGHT_YELLOW}Welcome to the {LOGO} {BRIGHT_YELLOW}interpreter!{RES
     mini main.m     Interpret the file main.m
 """
 
+DEBUG_OPTIONS = frozenset(('--debug', '-d'))
+
 # === Main ===
 def main(args: list):
-    debug = False
-    # Options
-    if '--debug' in args or '-d' in args:
-        debug = True
-        args.remove('--debug') if '--debug' in args else args.remove('-d')
-    if len(args) == 0 or '--help' in args or '-h' in args :
+    # Look up options and commands in a set instead of scanning args for each one
+    options = frozenset(args)
+    debug = not options.isdisjoint(DEBUG_OPTIONS)
+    if debug:
+        args = [a for a in args if a not in DEBUG_OPTIONS]
+    if len(args) == 0 or '--help' in options or '-h' in options:
         print(USAGE)
         sys.exit(0)
     # Commands
-    if 'repl' in args or 'r' in args:
+    if 'repl' in options or 'r' in options:
         repl(debug)
         sys.exit(0)
-    elif 'docs' in args or 'd' in args:
+    elif 'docs' in options or 'd' in options:
         webbrowser.open('https://www.mini-lang.org/documentation')
         sys.exit(0)
-    elif 'compile' in args or 'c' in args:
+    elif 'compile' in options or 'c' in options:
         print_error_help("Not implemented yet!")
         sys.exit(0)
 
@@ -1,15 +1,20 @@
+import math
+
 class Node():
     """
     A base node in the abstract syntax tree.
     """
-    def __init__(self, name):
-        """
-        Initialize a node with a name
-        """
-        self.name = name
+    __slots__ = ("_str_cache",)
+    name = "Node"
 
     def __str__(self):
-        return self.formatted_str()
+        # Nodes are not changed after parsing, so the formatted string is
+        # computed once and reused by debug output and error messages.
+        try:
+            return self._str_cache
+        except AttributeError:
+            self._str_cache = self.formatted_str()
+            return self._str_cache
     
     def raw_str(self):
         """
@@ -29,24 +34,35 @@ class ProgramNode(Node):
     """
     A program node in the abstract syntax tree.
     """
+    __slots__ = ("expressions",)
+    name = "Program"
+
     def __init__(self, expressions: list[Node]):
         """
         Initialize a program node with a list of expressions.
         """
-        super().__init__("Program")
         self.expressions = expressions
 
 class AtomicNode(Node):
     """
     An atomic expression node in the abstract syntax tree.
     """
+    __slots__ = ("type", "value", "isInteger", "depth", "slot", "atom")
+    name = "Atomic"
+
     def __init__(self, type: str, value):
         """
         Initialize an atomic expression node with a value.
         """
-        super().__init__("Atomic")
         self.type = type
         self.value = value
+        # Classify numbers once here instead of every time the node is used
+        self.isInteger = type == "number" and (isinstance(value, int) or value.is_integer())
+        # Identifiers resolved to a parameter slot, `depth` environments up
+        self.depth: int | None = None
+        self.slot: int | None = None
+        # The value atom of a literal, created by the evaluator on first use
+        self.atom = None
 
 
     def raw_str(self):
@@ -67,15 +83,34 @@ class AtomicNode(Node):
             return f"'{self.value}'"
         return f"{self.type}({self.value})"
 
+def make_atomic(type: str, value, cache: dict[tuple, AtomicNode]) -> AtomicNode:
+    """
+    Get an atomic expression node for a value.
+    Literals are hash-consed in the cache so that every occurrence of the same literal
+    shares one node, identifiers always get a node of their own.
+    """
+    if type == "identifier":
+        return AtomicNode(type, value)
+    key = (type, value.__class__, value)
+    if value.__class__ is float and value == 0:
+        key += (math.copysign(1, value),) # -0.0 == 0.0 but they are different literals
+    node = cache.get(key)
+    if node is None:
+        node = AtomicNode(type, value)
+        cache[key] = node
+    return node
+
 class BlockNode(Node):
     """
     A block node in the abstract syntax tree.
     """
+    __slots__ = ("expressions",)
+    name = "Block"
+
     def __init__(self, expressions: list[Node]):
         """
         Initialize a block node with a list of expressions.
         """
-        super().__init__("Block")
         self.expressions = expressions
 
     def formatted_str(self):
@@ -85,11 +120,13 @@ class TupleNode(Node):
     """
     A tuple node in the abstract syntax tree.
     """
+    __slots__ = ("elements",)
+    name = "Tuple"
+
     def __init__(self, elements: list[Node]):
         """
         Initialize a tuple node with a list of elements.
         """
-        super().__init__("Tuple")
         self.elements = elements
 
     def formatted_str(self):
@@ -99,11 +136,13 @@ class ListNode(Node):
     """
     A list node in the abstract syntax tree.
     """
+    __slots__ = ("elements",)
+    name = "List"
+
     def __init__(self, elements: list[Node]):
         """
         Initialize a list node with a list of elements.
         """
-        super().__init__("List")
         self.elements = elements
 
     def formatted_str(self):
@@ -113,11 +152,13 @@ class SliceNode(Node):
     """
     A slice node in the abstract syntax tree.
     """
+    __slots__ = ("start", "end", "step")
+    name = "Slice"
+
     def __init__(self, start: int, end: int, step: int | None):
         """
         Initialize a slice node with a start, end and step.
         """
-        super().__init__("Slice")
         self.start = start
         self.end = end
         self.step = step
@@ -130,26 +171,39 @@ class MapNode(Node):
     """
     A hash map node in the abstract syntax tree.
     """
+    __slots__ = ("pairs", "keyStrings", "valueNodes")
+    name = "Map"
+
     def __init__(self, pairs: dict[Node, Node]):
         """
         Initialize a map node with a list of elements.
         """
-        super().__init__("Map")
         self.pairs = pairs
+        # Keys are literals, so the strings they are stored under are computed once.
+        # Invalid keys leave keyStrings as None and are reported by the evaluator.
+        self.keyStrings: list[str] | None = []
+        for key in pairs:
+            if not (isinstance(key, AtomicNode) and (key.isInteger or key.type in ("identifier", "string", "bool"))):
+                self.keyStrings = None
+                break
+            self.keyStrings.append(str(int(key.value)) if key.isInteger else str(key.value))
+        self.valueNodes = list(pairs.values())
 
     def formatted_str(self):
-        return '#{' + ', '.join(map(lambda t: f"{t[0]}: {t[1]}", self.pairs.items())) + '}'
+        return '#{' + ', '.join([f"{k}: {v}" for k, v in self.pairs.items()]) + '}'
 
 class UnaryNode(Node):
     """
     A unary node in the abstract syntax tree.
     """
+    __slots__ = ("operator", "rhs")
+    name = "Unary"
+
     def __init__(self, operator: str, rhs: Node):
         """
         Initialize a unary expression node with an operator and a right
         expression.
         """
-        super().__init__("Unary")
         self.operator = operator
         self.rhs = rhs
 
@@ -160,15 +214,21 @@ class BinaryNode(Node):
     """
     A binary expression node in the abstract syntax tree.
     """
+    __slots__ = ("operator", "left", "right", "operationCache", "assignment")
+    name = "Binary"
+
     def __init__(self, operator: str, left: Node, right: Node):
         """
         Initialize a binary expression node with an operator, left and right
         expressions.
         """
-        super().__init__("Binary")
         self.operator = operator
         self.left = left
         self.right = right
+        # Operand types and operation last used by the evaluator for this node
+        self.operationCache: tuple | None = None
+        # Classified left hand side of an assignment, set by the evaluator
+        self.assignment: tuple | None = None
 
     def formatted_str(self):
         return f"({self.left} {self.operator} {self.right})"
@@ -177,11 +237,13 @@ class LambdaNode(Node):
     """
     A lambda function node in the abstract syntax tree.
     """
+    __slots__ = ("params", "body")
+    name = "Lambda"
+
     def __init__(self, params: list[str], body: Node):
         """
         Initialize a lambda function node with a list of parameters and a body.
         """
-        super().__init__("Lambda")
         self.params = params
         self.body = body
 
@@ -193,12 +255,14 @@ class IfNode(Node):
     An if node in the abstract syntax tree.
     Contains a condition and body togehter with an optional if else statements and else body.
     """
-    def __init__(self, condition: Node, ifBody: Node, elseIfs: list[tuple[Node, Node]] = [], elseBody: Node = None):
+    __slots__ = ("condition", "ifBody", "elseBody", "elseIfs")
+    name = "If"
+
+    def __init__(self, condition: Node, ifBody: Node, elseIfs: list[tuple[Node, Node]] = None, elseBody: Node = None):
         """
         Initialize an if node with a condition, if body and an optional else body and else ifs.
         """
-        super().__init__("If")
         self.condition = condition
         self.ifBody = ifBody
         self.elseBody = elseBody
-        self.elseIfs = elseIfs
+        self.elseIfs = elseIfs if elseIfs is not None else []
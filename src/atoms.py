@@ -15,6 +15,8 @@ class Atom():
     """
     A fundamental value type in the language.
     """
+    __slots__ = ("uid", "name", "type")
+
     def __init__(self, name, type):
         """
         Initialize an atom with a name and a type.
@@ -62,6 +64,8 @@ class IntrinsicAtom(Atom):
     An intrinsic value node in the abstract syntax tree.
     This is not intended to be created by the user.
     """
+    __slots__ = ("value",)
+
     def __init__(self, type: str, value):
         """
         Initialize an intrinsic value node with a value.
@@ -81,10 +85,15 @@ class IntrinsicAtom(Atom):
     def structural_eq(self, other: "Atom") -> bool:
         return isinstance(other, IntrinsicAtom) and self.type == other.type and self.value == other.value
 
+# Value types that are never changed in place
+immutable_types = frozenset(("number", "string", "bool", "unit"))
+
 class ValueAtom(Atom):
     """
     An atomic value node in the abstract syntax tree.
     """
+    __slots__ = ("value",)
+
     def __init__(self, type: str, value):
         """
         Initialize an atomic value node with a value.
@@ -99,40 +108,55 @@ class ValueAtom(Atom):
         self.value = value
 
     def listValueToStr(self):
-        return list(map(lambda a: a.formatted_str(), self.value))
+        return [a.formatted_str() for a in self.value]
     
     def raw_str(self):
+        # Strings are their own raw value, builtins ask for it on every call
+        if self.type == "string": return self.value
         return self.format(True)
 
     def formatted_str(self):
         return self.format(False)
 
     def format(self, raw: bool) -> str:
-        if self.type == "string":
-            if raw: return self.value
-            escaped = self.value.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+        """
+        Shared formatter behind raw_str and formatted_str.
+        Only strings are formatted differently depending on raw.
+        """
+        type, value = self.type, self.value
+        if type == "number":
+            return str(value)
+        elif type == "string":
+            if raw: return value
+            escaped = value.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
             return f"'{escaped}'"
-        elif self.type == "bool":
-            return str(self.value).lower()
-        elif self.type == "unit":
+        elif type == "bool":
+            return str(value).lower()
+        elif type == "unit":
             return "()"
-        elif self.type == "tuple":
+        elif type == "tuple":
             return '(' + ", ".join(self.listValueToStr()) + ')'
-        elif self.type == "list":
+        elif type == "list":
             return '[' + ", ".join(self.listValueToStr()) + ']'
-        elif self.type == "map":
-            if not isinstance(self.value, dict):
-                raise Exception(f"ValueAtom of type 'map' has value of type '{type(self.value)}'!")
-            value: dict[str, ValueAtom] = self.value
-            return '#{' + ", ".join(map(lambda t: f"{t[0]}: {t[1].formatted_str()}", value.items())) + '}'
-        return str(self.value)
+        elif type == "map":
+            if not isinstance(value, dict):
+                raise Exception(f"ValueAtom of type 'map' has value of type '{value.__class__}'!")
+            return '#{' + ", ".join([f"{k}: {v.formatted_str()}" for k, v in value.items()]) + '}'
+        return str(value)
 
 
     def memory_repr(self):
         return f"<{self.uid}:{self.type}:{self.formatted_str()}>"
 
+    def __hash__(self):
+        # Only immutable values can be hashed, consistent with structural equality
+        if self.type in immutable_types:
+            return hash((self.type, self.value))
+        raise TypeError(f"Unhashable atom type: '{self.type}'")
+
     def structural_eq(self, other: "Atom") -> bool:
         if isinstance(other, ValueAtom) and self.type == other.type:
+            if self.type in immutable_types: return self.value == other.value
             match self.type:
                 case "map":
                     if len(self.value) != len(other.value): return False
@@ -142,24 +166,54 @@ class ValueAtom(Atom):
                     return True
                 case "tuple" | "list":
                     if len(self.value) != len(other.value): return False
-                    return all(map(lambda t: t[0].structural_eq(t[1]), zip(self.value, other.value)))
+                    return all(a.structural_eq(b) for a, b in zip(self.value, other.value))
                 case "unit": return True # Unit is always equal
                 case _: return self.value == other.value
         return False
 
+# Shared atoms for the unit value and the two bools
+UNIT_ATOM = ValueAtom("unit", None)
+TRUE_ATOM = ValueAtom("bool", True)
+FALSE_ATOM = ValueAtom("bool", False)
+
+# Number atoms are never mutated, so small integers share one atom each
+number_pool = [ValueAtom("number", i) for i in range(-128, 1024)]
+
+def number_atom(value) -> ValueAtom:
+    """
+    Get a number atom for a value, small integers are taken from the pool.
+    """
+    if value.__class__ is int and -128 <= value < 1024:
+        return number_pool[value + 128]
+    return ValueAtom("number", value)
+
+def number_range(start, end, step=1) -> list[ValueAtom]:
+    """
+    Get the number atoms from start up to end, ranges inside the pool are sliced from it.
+    """
+    if (start.__class__ is int and end.__class__ is int and step.__class__ is int
+            and -128 <= start < 1024 and -128 <= end <= 1024):
+        return number_pool[start + 128:end + 128:step]
+    return [number_atom(i) for i in range(start, end, step)]
+
 class FunctionAtom(Atom):
     """
     A function node in the abstract syntax tree.
     """
+    __slots__ = ("argumentNames", "argumentIndices", "arity", "body", "environment", "callName")
+
     def __init__(self, argumentNames: list[str], body: Node, environment, name: str = None):
         """
         Initialize a function node with a function name, argument names, body and the environment in which it was defined.
         """
         super().__init__("Function", "function")
         self.argumentNames = argumentNames
+        self.argumentIndices = {name: i for i, name in enumerate(argumentNames)}
+        self.arity = len(argumentNames)
         self.body = body
         self.environment = environment
         self.name = name if name is not None else "lambda"
+        self.callName = f"<function {self.name}>" # Name of the call environments
 
     def memory_repr(self):
         return f"<{self.uid}:{self.name}({', '.join(self.argumentNames)})>"
@@ -171,13 +225,28 @@ class BuiltinFunctionAtom(Atom):
     """
     A builtin function node in the abstract syntax tree.
     """
-    def __init__(self, functionName: str, func: Callable):
+    __slots__ = ("functionName", "func", "overloads")
+
+    def __init__(self, functionName: str, func: Callable, overloads: dict[int, Callable] | None = None):
         """
         Initialize a builtin function node with a function name and a function.
+        The overloads map each accepted number of arguments to the function to call,
+        None means the function accepts any number of arguments.
         """
         super().__init__("Built-in function", "function")
         self.functionName = functionName
         self.func = func
+        self.overloads = overloads
+
+    def arity_error(self, count: int) -> Exception:
+        """
+        Get the error for calling the function with an unsupported number of arguments.
+        """
+        expected = sorted(self.overloads)
+        expected_str = (", ".join(str(e) for e in expected[:-1]) + " or " + str(expected[-1])
+                        if len(expected) > 1
+                        else str(expected[0]))
+        return Exception(f"Function '{self.functionName}' expected {expected_str} arguments but got {count}!")
 
     def memory_repr(self):
         return f"<built-in: {self.functionName}>"
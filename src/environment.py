@@ -7,13 +7,17 @@ class Environment():
     The Environment class is used to store the values of
     variables in a scope during the execution of a program.
     """
-    def __init__(self, name: str, parent):
+    def __init__(self, name: str, parent, slots: tuple[Atom, ...] = None, slotIndices: dict[str, int] = None):
         """
         Initialize an environment with a name and a parent environment.
+        Function call environments also hold the arguments in slots,
+        indexed by parameter name in `slotIndices`.
         """
         self.name = name
         self.parent: Environment = parent
         self.values: dict[str, Atom] = {}
+        self.slots = slots
+        self.slotIndices = slotIndices
 
     def set(self, name: str, value: Atom) -> None:
         self.values[name] = value
@@ -21,6 +25,8 @@ class Environment():
     def get(self, name: str):
         if name in self.values:
             return self.values[name]
+        elif self.slotIndices is not None and name in self.slotIndices:
+            return self.slots[self.slotIndices[name]]
         elif self.parent:
             return self.parent.get(name)
         else:
@@ -1,4 +1,6 @@
-from .atoms import Atom, BuiltinFunctionAtom, FunctionAtom, ValueAtom
+from typing import Callable
+
+from .atoms import FALSE_ATOM, TRUE_ATOM, UNIT_ATOM, Atom, BuiltinFunctionAtom, FunctionAtom, ValueAtom, number_atom, number_range
 from .ast import AtomicNode, BinaryNode, BlockNode, IfNode, LambdaNode, ListNode, MapNode, Node, ProgramNode, SliceNode, TupleNode, UnaryNode
 from .environment import Environment
 
@@ -9,6 +11,7 @@ debug = False
 def dprint(*args):
     """
     Print debug messages.
+    Callers check `debug` first, so the message is only formatted when it is printed.
     """
     if debug:
         print(*args)
@@ -38,21 +41,21 @@ def compatible_type(value: Atom, types: list[str]) -> bool:
         raise Exception(f"Incompatible types: {value.type} and {types}")
 
 def is_identifier(expression: Node) -> bool:
-    return isinstance(expression, AtomicNode) and expression.type == "identifier"
+    return type(expression) is AtomicNode and expression.type == "identifier"
 
 def is_identifier_members(expression: Node) -> bool:
-    return isinstance(expression, BinaryNode) and expression.operator == "DOT" and (
+    return type(expression) is BinaryNode and expression.operator == "DOT" and (
         is_identifier(expression.left) or is_identifier_members(expression.left)
     ) and is_identifier(expression.right)
 
 def is_index_expression(expression: Node) -> bool:
-    return isinstance(expression, BinaryNode) and expression.operator == "INDEX"
+    return type(expression) is BinaryNode and expression.operator == "INDEX"
 
 def get_left_most_bin_term(expression: Node, op: str) -> Node:
     """
     Get the base of a member expression.
     """
-    if isinstance(expression, BinaryNode) and expression.operator == op:
+    if type(expression) is BinaryNode and expression.operator == op:
         return get_left_most_bin_term(expression.left, op)
     else:
         return expression
@@ -61,186 +64,369 @@ def flatten_bin_terms(expression: Node, op: str, includeBase: bool) -> list[str]
     """
     Get the path of a member expression.
     """
-    if isinstance(expression, BinaryNode) and expression.operator == op:
-        return flatten_bin_terms(expression.left, op, includeBase) + [expression.right.value]
-    else:
-        return [expression.value] if includeBase else []
+    path: list[str] = []
+    while type(expression) is BinaryNode and expression.operator == op:
+        path.append(expression.right.value)
+        expression = expression.left
+    if includeBase:
+        path.append(expression.value)
+    path.reverse()
+    return path
 
 def set_nested_value(obj: ValueAtom, path: list[str], rhs: Atom) -> ValueAtom:
     """
     Set the value of a member expression.
     """
     if len(path) == 0: raise Exception("Member path is empty")
-    elif len(path) == 1:
-        obj.value[path[0]] = rhs
-        return obj
-    else:
-        obj.value[path[0]] = set_nested_value(obj.value[path[0]], path[1:], rhs)
-        return obj
+    parent = obj
+    for key in path[:-1]:
+        parent = parent.value[key]
+    parent.value[path[-1]] = rhs
+    return obj
+
+# Operations on value atoms of fixed operand types, keyed by (operator, lhs type, rhs type).
+# Each node caches the entry it used last, so repeated evaluation with the same
+# operand types skips the operator cascade in `evaluate_binary_atom_expression`.
+binary_operations: dict[tuple[str, str, str], Callable[[ValueAtom, ValueAtom], Atom]] = {
+    ("PLUS", "number", "number"): lambda lhs, rhs: number_atom(lhs.value + rhs.value),
+    ("PLUS", "string", "string"): lambda lhs, rhs: ValueAtom("string", lhs.value + rhs.value),
+    ("PLUS", "string", "number"): lambda lhs, rhs: ValueAtom("string", lhs.value + rhs.raw_str()),
+    ("PLUS", "number", "string"): lambda lhs, rhs: ValueAtom("string", lhs.raw_str() + rhs.value),
+    ("MINUS", "number", "number"): lambda lhs, rhs: number_atom(lhs.value - rhs.value),
+    ("MULTIPLY", "number", "number"): lambda lhs, rhs: number_atom(lhs.value * rhs.value),
+    ("DIVIDE", "number", "number"): lambda lhs, rhs: ValueAtom("number", lhs.value / rhs.value),
+    ("MODULO", "number", "number"): lambda lhs, rhs: number_atom(lhs.value % rhs.value),
+    ("POWER", "number", "number"): lambda lhs, rhs: ValueAtom("number", lhs.value ** rhs.value),
+    ("EQUAL", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value == rhs.value else FALSE_ATOM,
+    ("EQUAL", "string", "string"): lambda lhs, rhs: TRUE_ATOM if lhs.value == rhs.value else FALSE_ATOM,
+    ("NOTEQUAL", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value != rhs.value else FALSE_ATOM,
+    ("NOTEQUAL", "string", "string"): lambda lhs, rhs: TRUE_ATOM if lhs.value != rhs.value else FALSE_ATOM,
+    ("LESS", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value < rhs.value else FALSE_ATOM,
+    ("GREATER", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value > rhs.value else FALSE_ATOM,
+    ("LESSEQUAL", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value <= rhs.value else FALSE_ATOM,
+    ("GREATEREQUAL", "number", "number"): lambda lhs, rhs: TRUE_ATOM if lhs.value >= rhs.value else FALSE_ATOM,
+}
 
 # Evaluation functions
 
-def evaluate_expression(expression: Node, env: Environment) -> Atom:
-    if isinstance(expression, AtomicNode):
-        if is_identifier(expression):
-            dprint(f"Evaluating identifier '{expression.raw_str()}'")
-            val = env.get(expression.value)
-            if val is None:
-                raise Exception(f"identifier '{expression.value}' is not defined")
-            return val
-        else:
-            return ValueAtom(expression.type, expression.value)
-    elif isinstance(expression, TupleNode):
-        if len(expression.elements) == 0:
-            return ValueAtom("unit", None)
-        elif len(expression.elements) == 1:
-            return evaluate_expression(expression.elements[0], env)
-        else:
-            return ValueAtom("tuple", list(map(lambda e: evaluate_expression(e, env), expression.elements)))
-    elif isinstance(expression, ListNode):
-        return ValueAtom("list", list(map(lambda e: evaluate_expression(e, env), expression.elements)))
-    elif isinstance(expression, MapNode):
-        map_values: dict[str, Atom] = {}
-        for key, value in expression.pairs.items():
-            if not isinstance(key, AtomicNode):
-                raise Exception(f"Key in map is not an atomic value")
-            if key.type == "number" and key.value.is_integer():
-                key.value = int(key.value)
-                key.type = "integer"
-            if key.type not in ["identifier", "string", "integer", "bool"]:
-                raise Exception(f"Key in map is not an identifier, string, integer or bool")
-            value = evaluate_expression(value, env)
-            map_values[str(key.value)] = value
-        return ValueAtom("map", map_values)
-    elif isinstance(expression, BlockNode):
-        return evaluate_expressions(expression.expressions, Environment(f"<block>", env))
-    elif isinstance(expression, LambdaNode):
-        return FunctionAtom(expression.params, expression.body, env)
-    elif isinstance(expression, IfNode):
-        cond = evaluate_expression(expression.condition, env)
-        if not isinstance(cond, ValueAtom) or not cond.type == "bool":
-            raise Exception(f"Condition does not evaluate to a bool")
-        if cond.value:
-            return evaluate_expression(expression.ifBody, env)
-        else:
-            # Iterate over the else-ifs
-            for cond, body in expression.elseIfs:
-                cond = evaluate_expression(cond, env)
-                if not isinstance(cond, ValueAtom) or not cond.type == "bool":
-                    raise Exception(f"Condition does not evaluate to a bool")
-                if cond.value:
-                    return evaluate_expression(body, env)
-            # Evaluate the else body
-            return evaluate_expression(expression.elseBody, env)
-    elif isinstance(expression, UnaryNode):
-        op = expression.operator
-        rhs = evaluate_expression(expression.rhs, env)
-        if op == "MINUS" and compatible_type(rhs, ["number"]):
-            return ValueAtom("number", -rhs.value)
-        elif op == "NOT" and compatible_type(rhs, ["bool"]):
-            return ValueAtom("bool", not rhs.value)
-        else:
-            raise Exception(f"Unkown unary operator '{op}'")
-    elif isinstance(expression, BinaryNode):
-        op = expression.operator
-
-        if op == "ASSIGNMENT":
-            dprint(f"Evaluating assignment {expression.left.formatted_str()} = {expression.right.formatted_str()}")
-            if is_identifier(expression.left):
-                rhs = evaluate_expression(expression.right, env)
-                env.set(expression.left.value, rhs)
-                return rhs
-            elif is_identifier_members(expression.left) or is_index_expression(expression.left):
-                op = "DOT" if is_identifier_members(expression.left) else "INDEX"
-                rhs = evaluate_expression(expression.right, env)
-                base = get_left_most_bin_term(expression.left, op)
-                if is_identifier(base):
-                    obj = env.get(base.value)
-                    if obj is None: raise Exception(f"Object '{base.value}' is not defined")
-                    path = flatten_bin_terms(expression.left, op, False)
-                    obj = set_nested_value(obj, path, rhs)
-                    env.set(base.value, obj)
-                    return rhs
-                else:
-                    raise Exception(f"Cannot set member of non-identifer values")
-            elif isinstance(expression.left, BinaryNode) and expression.left.operator == "CALL":
-                # Function declaration 
-                functionName = expression.left.left
-                if not is_identifier(functionName):
-                    raise Exception(f"Function name is not an identifier")
-                args = expression.left.right
-                # Check that the arguments is a a tuple of identifiers
-                if not isinstance(args, TupleNode):
-                    raise Exception(f"Function arguments are not a tuple")
-                argNames: list[str] = []
-                for a in args.elements:
-                    if not isinstance(a, AtomicNode) or a.type != "identifier":
-                        raise Exception(f"Function argument '{a}' is not an identifier")
-                    argNames.append(a.value)
-                # Assign the right hand side as body of the function
-                body = expression.right
-                value = FunctionAtom(argNames, body, env, functionName.value)
-                # Update the environment
-                env.set(functionName.value, value)
-                return value
-            else:
-                raise Exception(f"Invalid assignment, left hand side is not an identifier, function or valid pattern")
-
-        lhs = evaluate_expression(expression.left, env)
-        if op == "DOT":
-            # Member access, last identifier is the member name and the rest is the object
-            dprint(f"Evaluating member access {lhs.formatted_str()}.{expression.right.formatted_str()} ({expression.right.__class__})")
-            if not is_identifier(expression.right):
-                raise Exception(f"Cannot access member of {lhs.type} with non-identifier key")
-            if not (isinstance(lhs, ValueAtom) and lhs.type in ["map", "tuple", "list"]):
-                raise Exception(f"Cannot access member of {lhs.type}")
-            if lhs.type == "map":
-                if expression.right.value not in lhs.value:
-                    raise Exception(f"Map does not contain key '{expression.right.value}'")
-                return lhs.value[expression.right.value]
-            raise Exception(f"Cannot access member of {lhs.type}, not implemented yet")
-        elif op == "INDEX" and isinstance(expression.right, SliceNode): # Slice indexing
-            # Evaluate the slice indices
-            start = evaluate_expression(expression.right.start, env)
-            end = evaluate_expression(expression.right.end, env)
-            step = ValueAtom("number", 1)
-            if expression.right.step is not None:
-                step = evaluate_expression(expression.right.step, env)
-            # Check that the slice indices are integers
-            if not compatible_types(start, end, ["number"]) or not compatible_type(step, ["number"]):
-                raise Exception(f"Slice indices must be integers")
-            start, end, step = int(start.value), int(end.value), int(step.value)
-            if compatible_type(lhs, ["list", "tuple"]):
-                lhs_slice = lhs.value[start:end:step]
-                element = None
-                if lhs.type == "list": element = ValueAtom("list", lhs_slice)
-                elif lhs.type == "tuple": element = ValueAtom("tuple", lhs_slice)
-                else: raise Exception(f"Cannot slice index {lhs.type}")
-                dprint(f"Indexing {lhs.type}: {lhs.formatted_str()} with slice {start}:{end}:{step} -> {element.formatted_str()}")
-                return element
+def evaluate_atomic(expression: AtomicNode, env: Environment) -> Atom:
+    """
+    Evaluate an atomic node, either an identifier lookup or a literal.
+    """
+    if expression.type == "identifier":
+        if debug: dprint(f"Evaluating identifier '{expression.raw_str()}'")
+        depth = expression.depth
+        if depth is not None:
+            # Parameter resolved to a slot of an enclosing function call
+            while depth:
+                env = env.parent
+                depth -= 1
+            return env.slots[expression.slot]
+        val = env.get(expression.value)
+        if val is None:
+            raise Exception(f"identifier '{expression.value}' is not defined")
+        return val
+    else:
+        # Literal atoms are never mutated, so each node creates its atom once
+        atom = expression.atom
+        if atom is None:
+            atom = expression.atom = ValueAtom(expression.type, expression.value)
+        return atom
+
+def evaluate_tuple(expression: TupleNode, env: Environment) -> Atom:
+    """
+    Evaluate a tuple node, the empty tuple is unit and a single element is itself.
+    """
+    if len(expression.elements) == 0:
+        return UNIT_ATOM
+    elif len(expression.elements) == 1:
+        return evaluate_expression(expression.elements[0], env)
+    else:
+        evaluate = evaluate_expression
+        return ValueAtom("tuple", [evaluate(e, env) for e in expression.elements])
+
+def evaluate_list(expression: ListNode, env: Environment) -> Atom:
+    """
+    Evaluate a list node.
+    """
+    evaluate = evaluate_expression
+    return ValueAtom("list", [evaluate(e, env) for e in expression.elements])
+
+def evaluate_map(expression: MapNode, env: Environment) -> Atom:
+    """
+    Evaluate a map node.
+    """
+    if expression.keyStrings is not None:
+        evaluate = evaluate_expression
+        return ValueAtom("map", {key: evaluate(value, env) for key, value in zip(expression.keyStrings, expression.valueNodes)})
+    map_values: dict[str, Atom] = {}
+    for key, value in expression.pairs.items():
+        if not isinstance(key, AtomicNode):
+            raise Exception(f"Key in map is not an atomic value")
+        key_type, key_value = key.type, key.value
+        if key.isInteger:
+            key_type, key_value = "integer", int(key_value)
+        if key_type not in ["identifier", "string", "integer", "bool"]:
+            raise Exception(f"Key in map is not an identifier, string, integer or bool")
+        value = evaluate_expression(value, env)
+        map_values[str(key_value)] = value
+    return ValueAtom("map", map_values)
 
+def evaluate_block(expression: BlockNode, env: Environment) -> Atom:
+    """
+    Evaluate a block node in a new scope.
+    """
+    return evaluate_expressions(expression.expressions, Environment(f"<block>", env))
+
+def evaluate_lambda(expression: LambdaNode, env: Environment) -> Atom:
+    """
+    Evaluate a lambda node into a function closing over the environment.
+    """
+    return FunctionAtom(expression.params, expression.body, env)
+
+def evaluate_if(expression: IfNode, env: Environment) -> Atom:
+    """
+    Evaluate an if node with its else-ifs and else body.
+    """
+    condition = expression.condition
+    cond = expression_evaluators[condition.__class__](condition, env)
+    if type(cond) is not ValueAtom or not cond.type == "bool":
+        raise Exception(f"Condition does not evaluate to a bool")
+    if cond.value:
+        return evaluate_expression(expression.ifBody, env)
+    else:
+        # Iterate over the else-ifs
+        for cond, body in expression.elseIfs:
+            cond = evaluate_expression(cond, env)
+            if type(cond) is not ValueAtom or not cond.type == "bool":
+                raise Exception(f"Condition does not evaluate to a bool")
+            if cond.value:
+                return evaluate_expression(body, env)
+        # Evaluate the else body
+        return evaluate_expression(expression.elseBody, env)
+
+def evaluate_unary(expression: UnaryNode, env: Environment) -> Atom:
+    """
+    Evaluate a unary operator node.
+    """
+    op = expression.operator
+    rhs = evaluate_expression(expression.rhs, env)
+    if op == "MINUS" and compatible_type(rhs, ["number"]):
+        return ValueAtom("number", -rhs.value)
+    elif op == "NOT" and compatible_type(rhs, ["bool"]):
+        return FALSE_ATOM if rhs.value else TRUE_ATOM
+    else:
+        raise Exception(f"Unkown unary operator '{op}'")
+
+def assignment_pattern(left: Node) -> tuple[str, str, list[str] | None]:
+    """
+    Classify the left hand side of an assignment.
+    Returns the kind of assignment, the identifier that is assigned to and
+    either the member path or the function parameter names.
+    """
+    if is_identifier(left):
+        return ("identifier", left.value, None)
+    elif is_identifier_members(left) or is_index_expression(left):
+        op = "DOT" if is_identifier_members(left) else "INDEX"
+        base = get_left_most_bin_term(left, op)
+        if not is_identifier(base):
+            raise Exception(f"Cannot set member of non-identifer values")
+        return ("member", base.value, flatten_bin_terms(left, op, False))
+    elif type(left) is BinaryNode and left.operator == "CALL":
+        # Function declaration
+        functionName = left.left
+        if not is_identifier(functionName):
+            raise Exception(f"Function name is not an identifier")
+        args = left.right
+        # Check that the arguments is a a tuple of identifiers
+        if not isinstance(args, TupleNode):
+            raise Exception(f"Function arguments are not a tuple")
+        argNames: list[str] = []
+        for a in args.elements:
+            if not isinstance(a, AtomicNode) or a.type != "identifier":
+                raise Exception(f"Function argument '{a}' is not an identifier")
+            argNames.append(a.value)
+        return ("function", functionName.value, argNames)
+    else:
+        raise Exception(f"Invalid assignment, left hand side is not an identifier, function or valid pattern")
+
+def evaluate_assignment(expression: BinaryNode, env: Environment) -> Atom:
+    """
+    Evaluate an assignment to an identifier, a member or index path, or a function declaration.
+    """
+    if debug: dprint(f"Evaluating assignment {expression.left.formatted_str()} = {expression.right.formatted_str()}")
+    # The left hand side only depends on the AST, so it is classified once per node
+    pattern = expression.assignment
+    if pattern is None:
+        pattern = expression.assignment = assignment_pattern(expression.left)
+    kind, name, path = pattern
+    if kind == "identifier":
+        rhs = evaluate_expression(expression.right, env)
+        env.set(name, rhs)
+        return rhs
+    elif kind == "member":
         rhs = evaluate_expression(expression.right, env)
-        # The rest of the operators rely on the right hand side being evaluated first
-        # Try to evaluate binary operators first
-        binOpResult = evaluate_binary_atom_expression(op, lhs, rhs, env)
-        if binOpResult is not None:
-            return binOpResult
-        if op == "PLUSEQUAL" and compatible_types(lhs, rhs, ["string", "number"]):
-            if not is_identifier(expression.left):
-                raise Exception(f"Left hand side of mutating assignment operator '{op}' must be an identifier")
-            if lhs.type == "string" or rhs.type == "string":
-                new_value = ValueAtom("string", lhs.raw_str() + rhs.raw_str())
-            else:
-                new_value = ValueAtom("number", lhs.value + rhs.value)
-            env.set(expression.left.value, new_value)
-            return new_value
-
-        raise Exception(f"Unknown binary operator '{op}'")
+        obj = env.get(name)
+        if obj is None: raise Exception(f"Object '{name}' is not defined")
+        obj = set_nested_value(obj, path, rhs)
+        env.set(name, obj)
+        return rhs
     else:
-        raise Exception(f"Unknown expression type '{type(expression)}'")
+        # Assign the right hand side as body of the function
+        value = FunctionAtom(path, expression.right, env, name)
+        # Update the environment
+        env.set(name, value)
+        return value
+
+def evaluate_member_access(expression: BinaryNode, env: Environment) -> Atom:
+    """
+    Evaluate a member access, the right hand side is the member name.
+    """
+    left = expression.left
+    lhs = expression_evaluators[left.__class__](left, env)
+    # Member access, last identifier is the member name and the rest is the object
+    if debug: dprint(f"Evaluating member access {lhs.formatted_str()}.{expression.right.formatted_str()} ({expression.right.__class__})")
+    if not is_identifier(expression.right):
+        raise Exception(f"Cannot access member of {lhs.type} with non-identifier key")
+    if not (isinstance(lhs, ValueAtom) and lhs.type in ["map", "tuple", "list"]):
+        raise Exception(f"Cannot access member of {lhs.type}")
+    if lhs.type == "map":
+        if expression.right.value not in lhs.value:
+            raise Exception(f"Map does not contain key '{expression.right.value}'")
+        return lhs.value[expression.right.value]
+    raise Exception(f"Cannot access member of {lhs.type}, not implemented yet")
+
+def evaluate_slice(expression: BinaryNode, lhs: Atom, env: Environment) -> Atom:
+    """
+    Evaluate slice indexing of an already evaluated list or tuple.
+    """
+    # Evaluate the slice indices
+    start = evaluate_expression(expression.right.start, env)
+    end = evaluate_expression(expression.right.end, env)
+    step = ValueAtom("number", 1)
+    if expression.right.step is not None:
+        step = evaluate_expression(expression.right.step, env)
+    # Check that the slice indices are integers
+    if not compatible_types(start, end, ["number"]) or not compatible_type(step, ["number"]):
+        raise Exception(f"Slice indices must be integers")
+    start, end, step = int(start.value), int(end.value), int(step.value)
+    if compatible_type(lhs, ["list", "tuple"]):
+        lhs_slice = lhs.value[start:end:step]
+        element = None
+        if lhs.type == "list": element = ValueAtom("list", lhs_slice)
+        elif lhs.type == "tuple": element = ValueAtom("tuple", lhs_slice)
+        else: raise Exception(f"Cannot slice index {lhs.type}")
+        if debug: dprint(f"Indexing {lhs.type}: {lhs.formatted_str()} with slice {start}:{end}:{step} -> {element.formatted_str()}")
+        return element
+    raise Exception(f"Cannot slice index {lhs.type}")
+
+def evaluate_and(expression: BinaryNode, env: Environment) -> Atom:
+    """
+    Evaluate a logical and, the right hand side is only evaluated if the left hand side is true.
+    """
+    lhs = evaluate_expression(expression.left, env)
+    if compatible_type(lhs, ["bool"]) and not lhs.value:
+        return lhs
+    rhs = evaluate_expression(expression.right, env)
+    compatible_types(lhs, rhs, ["bool"])
+    return rhs
+
+def evaluate_or(expression: BinaryNode, env: Environment) -> Atom:
+    """
+    Evaluate a logical or, the right hand side is only evaluated if the left hand side is false.
+    """
+    lhs = evaluate_expression(expression.left, env)
+    if compatible_type(lhs, ["bool"]) and lhs.value:
+        return lhs
+    rhs = evaluate_expression(expression.right, env)
+    compatible_types(lhs, rhs, ["bool"])
+    return rhs
+
+# Binary operators that need more than their evaluated operands
+binary_evaluators = {
+    "ASSIGNMENT": evaluate_assignment,
+    "DOT": evaluate_member_access,
+    "AND": evaluate_and,
+    "OR": evaluate_or,
+}
+
+def evaluate_binary(expression: BinaryNode, env: Environment) -> Atom:
+    """
+    Evaluate a binary operator node.
+    """
+    op = expression.operator
+    if op in binary_evaluators:
+        return binary_evaluators[op](expression, env)
+
+    # Operands, conditions and function bodies are dispatched directly
+    # to skip the extra evaluate_expression frame on these hot paths
+    left = expression.left
+    lhs = expression_evaluators[left.__class__](left, env)
+    right = expression.right
+    if op == "CALL" and right.__class__ is TupleNode:
+        # Arguments are evaluated straight into the argument list instead of into a tuple first
+        elements = right.elements
+        if len(elements) == 1:
+            # A single argument that evaluates to a tuple or unit is unpacked
+            arg = expression_evaluators[elements[0].__class__](elements[0], env)
+            if arg.__class__ is ValueAtom and arg.type == "tuple":
+                return evaluate_call(lhs, arg.value)
+            elif arg.__class__ is ValueAtom and arg.type == "unit":
+                return evaluate_call(lhs, [])
+            return evaluate_call(lhs, [arg])
+        evaluate = evaluate_expression
+        return evaluate_call(lhs, [evaluate(e, env) for e in elements])
+    if right.__class__ is SliceNode: # Slice indexing
+        return evaluate_slice(expression, lhs, env)
+    rhs = expression_evaluators[right.__class__](right, env)
+    # The rest of the operators rely on the right hand side being evaluated first
+    if lhs.__class__ is ValueAtom and rhs.__class__ is ValueAtom:
+        cache = expression.operationCache
+        if cache is not None and cache[0] == lhs.type and cache[1] == rhs.type:
+            return cache[2](lhs, rhs)
+        operation = binary_operations.get((op, lhs.type, rhs.type))
+        if operation is not None:
+            expression.operationCache = (lhs.type, rhs.type, operation)
+            return operation(lhs, rhs)
+    # Try to evaluate binary operators first
+    binOpResult = evaluate_binary_atom_expression(op, lhs, rhs, env)
+    if binOpResult is not None:
+        return binOpResult
+    if op == "PLUSEQUAL" and compatible_types(lhs, rhs, ["string", "number"]):
+        if not is_identifier(expression.left):
+            raise Exception(f"Left hand side of mutating assignment operator '{op}' must be an identifier")
+        if lhs.type == "string" or rhs.type == "string":
+            new_value = ValueAtom("string", lhs.raw_str() + rhs.raw_str())
+        else:
+            new_value = ValueAtom("number", lhs.value + rhs.value)
+        env.set(expression.left.value, new_value)
+        return new_value
+
+    raise Exception(f"Unknown binary operator '{op}'")
+
+# Evaluation function of each node type
+expression_evaluators = {
+    AtomicNode: evaluate_atomic,
+    TupleNode: evaluate_tuple,
+    ListNode: evaluate_list,
+    MapNode: evaluate_map,
+    BlockNode: evaluate_block,
+    LambdaNode: evaluate_lambda,
+    IfNode: evaluate_if,
+    UnaryNode: evaluate_unary,
+    BinaryNode: evaluate_binary,
+}
+
+def evaluate_unknown(expression: Node, env: Environment) -> Atom:
+    raise Exception(f"Unknown expression type '{type(expression)}'")
+
+def evaluate_expression(expression: Node, env: Environment) -> Atom:
+    return expression_evaluators.get(expression.__class__, evaluate_unknown)(expression, env)
 
 def evaluate_binary_atom_expression(op: str, lhs: Atom, rhs: Atom, env: Environment) -> Atom:
-    dprint(f"Evaluating binary expression {lhs.formatted_str()} {op} {rhs.formatted_str()}")
+    if debug: dprint(f"Evaluating binary expression {lhs.formatted_str()} {op} {rhs.formatted_str()}")
+    # Inlined type check for the number operators, compatible_types raises the error otherwise
+    numbers = lhs.__class__ is ValueAtom and rhs.__class__ is ValueAtom and lhs.type == "number" and rhs.type == "number"
     if op == "PLUS" and compatible_types(lhs, rhs, ["string", "number", "bool", "list", "tuple", "map"]):
         if lhs.type == "string" or rhs.type == "string":
             return ValueAtom("string", lhs.raw_str() + rhs.raw_str())
@@ -252,43 +438,39 @@ def evaluate_binary_atom_expression(op: str, lhs: Atom, rhs: Atom, env: Environm
             # Ensure that the tuples have the same length
             if len(lhs.value) != len(rhs.value):
                 raise Exception(f"Tuple size mismatch: {len(lhs.value)} and {len(rhs.value)}")
-            new_value = map(lambda e: evaluate_binary_atom_expression("PLUS", e[0], e[1], env), zip(lhs.value, rhs.value))
-            return ValueAtom("tuple", list(new_value))
+            plus = evaluate_binary_atom_expression
+            return ValueAtom("tuple", [plus("PLUS", a, b, env) for a, b in zip(lhs.value, rhs.value)])
         elif lhs.type == "map" and rhs.type == "map":
             # Concate the maps
             return ValueAtom("map", {**lhs.value, **rhs.value})
         else:
             raise Exception(f"Cannot add {lhs.type} and {rhs.type}")
-    elif op == "MINUS" and compatible_types(lhs, rhs, ["number"]):
+    elif op == "MINUS" and (numbers or compatible_types(lhs, rhs, ["number"])):
         return ValueAtom("number", lhs.value - rhs.value)
-    elif op == "MULTIPLY" and compatible_types(lhs, rhs, ["number"]):
+    elif op == "MULTIPLY" and (numbers or compatible_types(lhs, rhs, ["number"])):
         return ValueAtom("number", lhs.value * rhs.value)
-    elif op == "DIVIDE" and compatible_types(lhs, rhs, ["number"]):
+    elif op == "DIVIDE" and (numbers or compatible_types(lhs, rhs, ["number"])):
         return ValueAtom("number", lhs.value / rhs.value)
-    elif op == "MODULO" and compatible_types(lhs, rhs, ["number"]):
+    elif op == "MODULO" and (numbers or compatible_types(lhs, rhs, ["number"])):
         return ValueAtom("number", lhs.value % rhs.value)
-    elif op == "POWER" and compatible_types(lhs, rhs, ["number"]):
+    elif op == "POWER" and (numbers or compatible_types(lhs, rhs, ["number"])):
         return ValueAtom("number", lhs.value ** rhs.value)
     elif op == "EQUAL" and compatible_types(lhs, rhs, ["number", "string", "bool", "unit", "tuple", "list", "map"]):
         if lhs.type != rhs.type:
-            return ValueAtom("bool", False)
-        return ValueAtom("bool", lhs.value == rhs.value)
+            return FALSE_ATOM
+        return TRUE_ATOM if lhs.value == rhs.value else FALSE_ATOM
     elif op == "NOTEQUAL" and compatible_types(lhs, rhs, ["number", "string", "bool"]):
-        return ValueAtom("bool", lhs.value != rhs.value)
-    elif op == "LESS" and compatible_types(lhs, rhs, ["number"]):
-        return ValueAtom("bool", lhs.value < rhs.value)
-    elif op == "GREATER" and compatible_types(lhs, rhs, ["number"]):
-        return ValueAtom("bool", lhs.value > rhs.value)
-    elif op == "LESSEQUAL" and compatible_types(lhs, rhs, ["number"]):
-        return ValueAtom("bool", lhs.value <= rhs.value)
-    elif op == "GREATEREQUAL" and compatible_types(lhs, rhs, ["number"]):
-        return ValueAtom("bool", lhs.value >= rhs.value)
-    elif op == "AND" and compatible_types(lhs, rhs, ["bool"]):
-        return ValueAtom("bool", lhs.value and rhs.value)
-    elif op == "OR" and compatible_types(lhs, rhs, ["bool"]):
-        return ValueAtom("bool", lhs.value or rhs.value)
-    elif op == "RANGE" and compatible_types(lhs, rhs, ["number"]):
-        return ValueAtom("list", [ValueAtom("number", i) for i in range(lhs.value, rhs.value)])
+        return TRUE_ATOM if lhs.value != rhs.value else FALSE_ATOM
+    elif op == "LESS" and (numbers or compatible_types(lhs, rhs, ["number"])):
+        return TRUE_ATOM if lhs.value < rhs.value else FALSE_ATOM
+    elif op == "GREATER" and (numbers or compatible_types(lhs, rhs, ["number"])):
+        return TRUE_ATOM if lhs.value > rhs.value else FALSE_ATOM
+    elif op == "LESSEQUAL" and (numbers or compatible_types(lhs, rhs, ["number"])):
+        return TRUE_ATOM if lhs.value <= rhs.value else FALSE_ATOM
+    elif op == "GREATEREQUAL" and (numbers or compatible_types(lhs, rhs, ["number"])):
+        return TRUE_ATOM if lhs.value >= rhs.value else FALSE_ATOM
+    elif op == "RANGE" and (numbers or compatible_types(lhs, rhs, ["number"])):
+        return ValueAtom("list", number_range(lhs.value, rhs.value))
     elif op == "INDEX" and compatible_type(lhs, ["list", "tuple", "map"]):
         if not isinstance(rhs, ValueAtom):
             raise Exception(f"Indexing expression in not a valid value type: {rhs}")
@@ -301,11 +483,13 @@ def evaluate_binary_atom_expression(op: str, lhs: Atom, rhs: Atom, env: Environm
                     print(lhs.value)
                     raise Exception(f"Map does not contain key '{index}'")
                 element: Atom = lhs.value[index]
-            dprint(f"Indexing {lhs.type}: {lhs.formatted_str()} with index {rhs.formatted_str()} -> {element.formatted_str()}")
+            if debug: dprint(f"Indexing {lhs.type}: {lhs.formatted_str()} with index {rhs.formatted_str()} -> {element.formatted_str()}")
             return element
         else:
             raise Exception(f"Indexing expression does not evaluate to an integer or string")
     elif op == "CALL":
+        # Calls with an argument list are handled by evaluate_binary,
+        # this is for a callee applied to any other expression.
         # The tuple may have been evaluated to a single value
         args = [rhs]
         if isinstance(rhs, ValueAtom):
@@ -319,30 +503,43 @@ def evaluate_binary_atom_expression(op: str, lhs: Atom, rhs: Atom, env: Environm
     return None
 
 def evaluate_call(function: FunctionAtom | BuiltinFunctionAtom, args: list[Atom]) -> Atom:
-    if isinstance(function, FunctionAtom):
+    if type(function) is FunctionAtom:
         return evaluate_function_atom_call(function, args)
-    elif isinstance(function, BuiltinFunctionAtom):
-        return function.func(args) # Call the builtin function
+    elif type(function) is BuiltinFunctionAtom:
+        # The number of arguments selects the function to call, so builtins do not check it themselves
+        overloads = function.overloads
+        if overloads is None:
+            return function.func(args) # Accepts any number of arguments
+        func = overloads.get(len(args))
+        if func is None:
+            raise function.arity_error(len(args))
+        return func(args)
     else:
         raise Exception(f"Cannot call non-function: {function}")
 
 def evaluate_function_atom_call(function: FunctionAtom, args: list[Atom]) -> Atom:
     # Build a new environment for the function call
     # where the arguments are bound to the parameters
-    funcEnv = Environment(f"<function {function.name}>", function.environment)
-    if len(args) != len(function.argumentNames):
-        raise Exception(f"Function '{function.name}' expects {len(function.argumentNames)} arguments, but got {len(args)}")
-    for name, val in zip(function.argumentNames, args):
-        funcEnv.set(name, val)
-    return evaluate_expression(function.body, funcEnv)
+    if len(args) != function.arity:
+        raise Exception(f"Function '{function.name}' expects {function.arity} arguments, but got {len(args)}")
+    # The arguments are the slots of the environment, indexed by parameter position.
+    # They are copied because the argument list can be the value of a tuple or list,
+    # e.g. `f(tuple(xs))`, which the program can still change while the call runs.
+    funcEnv = Environment(function.callName, function.environment, tuple(args), function.argumentIndices)
+    body = function.body
+    if body.__class__ is BlockNode:
+        # A block body runs directly in the call environment, without a block environment of its own
+        return evaluate_expressions(body.expressions, funcEnv)
+    return expression_evaluators[body.__class__](body, funcEnv)
 
 def evaluate_expressions(expressions: list[Node], env: Environment) -> Atom:
     """
     Evaluate a list of expressions and return the last result.
     """
-    result = ValueAtom("unit", None)
+    evaluate = evaluate_expression
+    result = UNIT_ATOM
     for expression in expressions:
-        result = evaluate_expression(expression, env)
+        result = evaluate(expression, env)
     return result
 
 # Evaluator function
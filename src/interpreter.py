@@ -5,6 +5,8 @@ from .stdlib import init_stdlib
 from .error import print_error
 
 from .parser import Parser
+from .resolver import resolve
+from .optimizer import fold_constants
 from .lexer import Lexer
 from .evaluator import evaluate
 from .environment import Environment
@@ -21,7 +23,7 @@ def execute(input: TextIOBase, env: Environment, debug = False):
         parser = Parser(lexer, debug)
         if debug:
             print("== Tokens ==")
-        ast = parser.parse()
+        ast = resolve(fold_constants(parser.parse()))
         if debug:
             print("== AST ==")
             print('  ' + '\n  '.join(str(e) for e in ast.expressions))
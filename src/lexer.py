@@ -1,10 +1,106 @@
+import re
+import sys
+from bisect import bisect_right
 from io import TextIOBase
 
+# Patterns for the rest of a token after its first character
+IDENTIFIER_PATTERN = re.compile(r"\w*") # Same characters as isalnum() and '_'
+NUMBER_PATTERN = re.compile(r"\d*(?:\.(?!\.)\d*)?") # A single decimal point that does not start a range
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r]*")
+STRING_CONTENT_PATTERNS = {
+    '"': re.compile(r'[^"\\\0]*'),
+    "'": re.compile(r"[^'\\\0]*"),
+}
+
+# Character classes as bit flags
+DIGIT = 1 # Starts a number
+IDENTIFIER_START = 2 # Starts an identifier
+END_OF_EXPRESSION = 4 # Can end an expression, a following '(' or '[' is then a call or index
+
+def char_class(c: str) -> int:
+    """
+    Get the character class flags of a character.
+    """
+    return ((DIGIT if c.isdigit() else 0)
+        | (IDENTIFIER_START if c.isalpha() or c == '_' else 0)
+        | (END_OF_EXPRESSION if c.isalnum() or c in "_]})" else 0))
+
+# Classes of the ASCII characters, other characters fall back to char_class
+ASCII_CHAR_CLASSES = bytes(char_class(chr(i)) for i in range(128))
+
+# Token names of the operators, two character operators are matched first.
+# Token names are string literals, which Python interns, so comparing the
+# names in the parser is a pointer comparison in the common case.
+TWO_CHAR_OPERATORS = {
+    '+=': "PLUSEQUAL",
+    '-=': "MINUSEQUAL",
+    '*=': "TIMESEQUAL",
+    '/=': "DIVEQUAL",
+    '%=': "MODEQUAL",
+    '^=': "POWEQUAL",
+    '<=': "LESSEQUAL",
+    '>=': "GREATEREQUAL",
+    '!=': "NOTEQUAL",
+    '==': "EQUAL",
+    '=>': "RIGHTARROW",
+    '&&': "AND",
+    '||': "OR",
+    '#{': "HASHBRACE",
+    '..': "RANGE",
+}
+ONE_CHAR_OPERATORS = {
+    '+': "PLUS",
+    '-': "MINUS",
+    '*': "MULTIPLY",
+    '/': "DIVIDE",
+    '%': "MODULO",
+    '^': "POWER",
+    '<': "LESS",
+    '>': "GREATER",
+    '=': "ASSIGNMENT",
+    '!': "NOT",
+    '&': "BITWISEAND",
+    '|': "BITWISEOR",
+    '~': "BITWISENOT",
+    '?': "QUESTIONMARK",
+    '.': "DOT",
+    ',': "COMMA",
+    ':': "COLON",
+    ';': "SEMICOLON",
+    '{': "LBRACE",
+    '}': "RBRACE",
+    ')': "RPAREN",
+    ']': "RBRACKET",
+}
+
+# Token name and value of the reserved words
+KEYWORDS = {
+    'true': ("BOOL", True),
+    'false': ("BOOL", False),
+    'if': ("KEYWORD", 'if'),
+    'else': ("KEYWORD", 'else'),
+    'match': ("KEYWORD", 'match'),
+    'class': ("KEYWORD", 'class'),
+    'enum': ("KEYWORD", 'enum'),
+    'while': ("KEYWORD", 'while'),
+    'for': ("KEYWORD", 'for'),
+    'break': ("KEYWORD", 'break'),
+    'continue': ("KEYWORD", 'continue'),
+    'return': ("KEYWORD", 'return'),
+    'and': ("AND", 'and'),
+    'or': ("OR", 'or'),
+    'not': ("NOT", 'not'),
+    'is': ("IS", 'is'),
+    'in': ("IN", 'in'),
+}
+
 # Token class
 class Token():
     """
     The smallest unit of the language.
     """
+    __slots__ = ("name", "value", "line", "column")
+
     def __init__(self, name: str, line, column, value = None):
         """
         Initialize a token with a name and a value.
@@ -23,10 +119,18 @@ class Token():
 # Lexer class
 class Lexer:
     def __init__(self, source: TextIOBase, debug = False):
-        self.__source = source
-        self.__process_queue: list[str] = [] # FIFO Queue of chars that have been read but not yet processed
-        self.__line = 1
-        self.__column = 1
+        # The whole source is read once, characters are then indexed by position.
+        # The buffer ends with a '\0' sentinel, so looking ahead never runs past it.
+        self.__buf: str = source.read() + '\0'
+        self.__len = len(self.__buf) - 1 # Length of the source, the position of the sentinel
+        self.__pos = 0 # Position of the next character to read
+        # Position of the first character of each line, lines and columns are
+        # only computed from the position when a token or error is created
+        self.__line_starts = [0]
+        newline = self.__buf.find('\n')
+        while newline != -1:
+            self.__line_starts.append(newline + 1)
+            newline = self.__buf.find('\n', newline + 1)
         self.__debug = debug
         self.__prev_char: str = None # Previously read character
         self.__peeked_token: Token | None = None # The last token that was peeked
@@ -36,20 +140,32 @@ class Lexer:
     def __dprint(self, *args):
         """
         Print debug information.
+        Callers check `self.__debug` first, so the message is only formatted when it is printed.
         """
         if self.__debug:
             print(*args)
+    def __position(self) -> tuple[int, int]:
+        """
+        Get the line and column of the current position, tabs count as 4 columns.
+        """
+        pos = self.__pos
+        line = bisect_right(self.__line_starts, pos)
+        s = self.__buf[self.__line_starts[line - 1]:pos]
+        return line, 1 + len(s) + 3 * s.count('\t')
+
     def __token(self, name: str, value = None) -> Token:
         """
         Create a token with the given name and value.
         """
-        return Token(name, self.__line, self.__column, value)
+        line, column = self.__position()
+        return Token(name, line, column, value)
 
     def __error(self, msg: str):
         """
         Raise an error with the given message.
         """
-        raise Exception(f"Syntax Error at {self.__line}:{self.__column}: {msg}")
+        line, column = self.__position()
+        raise Exception(f"Syntax Error at {line}:{column}: {msg}")
 
     # Tokenizer functions
     def __can_read(self) -> bool:
@@ -59,26 +175,9 @@ class Lexer:
         Returns
         -------
         bool
-            True if source can be read, False otherwise.
-        """
-        return self.__source.readable()
-
-    def __queue_request(self, length: int):
+            True if there are characters left in the source, False otherwise.
         """
-        Assert that the queue has at least the given length.
-        If the queue is too short, read more characters from source
-        until the queue is as long as the given length.
-
-        Parameters
-        ----------
-        length : int
-            The length to assert.
-        """
-        while len(self.__process_queue) < length:
-            if not self.__can_read(): break
-            c = self.__source.read(1)
-            if c == '': break
-            self.__process_queue.append(c)
+        return self.__pos < self.__len
 
     def __next_char(self):
         """
@@ -87,22 +186,36 @@ class Lexer:
         Returns
         -------
         str | None
-            The next character from the source stream.
-            Or None if the end of the stream has been reached.
-        """
-        self.__queue_request(1)
-        if len(self.__process_queue) == 0: return None
-        c = self.__process_queue.pop(0)
-        if c == '\n':
-            self.__line += 1
-            self.__column = 1
-        elif c == '\t':
-            self.__column += 4
-        else:
-            self.__column += 1
+            The next character from the source buffer.
+            Or None if the end of the source has been reached.
+        """
+        pos = self.__pos
+        if pos == self.__len: return None # At the sentinel
+        c = self.__buf[pos]
+        self.__pos = pos + 1
         self.__prev_char = c
         return c
     
+    def __advance(self, end: int) -> str:
+        """
+        Consume all characters up to the given position in one step.
+
+        Parameters
+        ----------
+        end : int
+            The position after the last character to consume.
+
+        Returns
+        -------
+        str
+            The consumed characters.
+        """
+        s = self.__buf[self.__pos:end]
+        if s:
+            self.__prev_char = s[-1]
+            self.__pos = end
+        return s
+
     def __expect_char(self, expected: str):
         """
         Assert that the next character from source is the expected character.
@@ -116,23 +229,17 @@ class Lexer:
         if c == None: self.__error(f"Expected {expected} but got EOF")
         return c
 
-    def __peek_char(self, offset = 0) -> str:
+    def __peek_char(self) -> str:
         """
         Get the next character from source without consuming it from the stream.
 
-        Parameters
-        ----------
-        offset : int
-            The offset from the current position.
-
         Returns
         -------
         str
-            The next character from the source stream.
-            Or '\\0' if the end of the stream has been reached.
+            The next character from the source buffer.
+            Or the '\\0' sentinel if the end of the source has been reached.
         """
-        self.__queue_request(1 + offset)
-        return self.__process_queue[offset] if len(self.__process_queue) > offset else '\0'
+        return self.__buf[self.__pos]
 
     def __read_string(self, quote: str) -> Token:
         """
@@ -148,27 +255,32 @@ class Lexer:
         Token
             A token with the string value.
         """
-        s = ""
+        parts: list[str] = [] # Joined once at the end instead of growing a string
+        content = STRING_CONTENT_PATTERNS[quote]
         while self.__can_read():
-            c = self.__expect_char("string content, escape sequence, or closing quote")
+            # Consume everything up to the next quote, escape sequence or '\0' at once
+            parts.append(self.__advance(content.match(self.__buf, self.__pos).end()))
+            if not self.__can_read():
+                break
+            c = self.__next_char()
             if c == quote:
-                return self.__token("STRING", s)
+                return self.__token("STRING", "".join(parts))
             elif c == '\\':
                 c = self.__expect_char("string escape sequence")
                 if c == 'n':
-                    s += '\n'
+                    parts.append('\n')
                 elif c == 't':
-                    s += '\t'
+                    parts.append('\t')
                 elif c == 'r':
-                    s += '\r'
+                    parts.append('\r')
                 elif c == '\\':
-                    s += '\\'
+                    parts.append('\\')
                 elif c in ['"', "'"]:
-                    s += c
+                    parts.append(c)
                 else:
                     self.__error("Invalid escape sequence: \\" + c)
             else:
-                s += c
+                parts.append(c) # A '\0' in the source that is not the sentinel
         self.__error("Unterminated string")
 
     def __read_identifier(self, first: str) -> Token:
@@ -180,15 +292,8 @@ class Lexer:
         Token
             A token with the identifier value.
         """
-        s = first
-        nc = self.__peek_char()
-        while nc.isalnum() or nc == '_':
-            s += self.__expect_char("identifier character")
-            if self.__can_read():
-                nc = self.__peek_char()
-            else:
-                break
-        return self.__token("IDENTIFIER", s)
+        s = first + self.__advance(IDENTIFIER_PATTERN.match(self.__buf, self.__pos).end())
+        return self.__token("IDENTIFIER", sys.intern(s)) # Interned for fast environment lookups
 
     def __read_number(self, first: str) -> Token:
         """
@@ -199,26 +304,18 @@ class Lexer:
         Token
             A token with the number value.
         """
-        s = first
-        decimalPoint = False
-        nc = self.__peek_char()
-        nnc = self.__peek_char(1)
-        while (nc.isdigit() or nc == '.') and not (nc == '.' and nnc == '.'):
-            if nc == '.':
-                if decimalPoint:
-                    break
-                decimalPoint = True
-            s += self.__expect_char("digit or decimal point")
-            if self.__can_read():
-                nc = self.__peek_char()
-            else:
-                break
-        value = float(s)
-        value = int(value) if value.is_integer() else value
+        s = first + self.__advance(NUMBER_PATTERN.match(self.__buf, self.__pos).end())
+        if '.' in s:
+            value = float(s)
+            value = int(value) if value.is_integer() else value # E.g. 1.0 is the integer 1
+        else:
+            value = int(s) # Integers skip the float round trip
         return self.__token("NUMBER", value)
 
     def __is_end_of_expression(self, c: str) -> bool:
-        return (c is not None) and (c.isalnum() or c in ['_', ']', '}', ')'])
+        if c is None: return False
+        o = ord(c)
+        return bool((ASCII_CHAR_CLASSES[o] if o < 128 else char_class(c)) & END_OF_EXPRESSION)
 
     def __read_token(self) -> Token:
         """
@@ -229,89 +326,53 @@ class Lexer:
         Token
             The next token from the source stream.
         """
+        # Skip whitespace, the previous character is then the last whitespace character
+        self.__advance(WHITESPACE_PATTERN.match(self.__buf, self.__pos).end())
         pc = self.__prev_char
         c = self.__next_char()
-        if c in ['', '\0', None]: return self.__token("EOF")
+        if c is None or c == '\0': return self.__token("EOF")
         nc = self.__peek_char() # Look ahead one character: LL(1)
 
-        # Whitespace
-        if c in [' ', '\t', '\n', '\r']:
-            return self.__read_token() # Skip whitespace
-        if c in ['"', "'"]:
+        if c in STRING_CONTENT_PATTERNS: # Quotes
             return self.__read_string(c)
-        if c.isdigit():
+        o = ord(c)
+        flags = ASCII_CHAR_CLASSES[o] if o < 128 else char_class(c)
+        if flags & DIGIT:
             return self.__read_number(c)
-        if c.isalpha() or c == '_':
+        if flags & IDENTIFIER_START:
             t = self.__read_identifier(c)
-            if t.value in ["true", "false"]:
-                return self.__token("BOOL", t.value == "true")
-            if t.value in ["if", "else", "match", "class", "enum", "while", "for", "break", "continue", "return"]:
-                return self.__token("KEYWORD", t.value)
-            if t.value in ["and", "or", "not", "is", "in"]:
-                return self.__token(t.value.upper(), t.value)
+            keyword = KEYWORDS.get(t.value)
+            if keyword is not None:
+                return self.__token(*keyword)
             return t
         if c == '/' and nc == '/':
             self.__expect_char("single line comment start")
-            comment = ""
-            while self.__can_read() and self.__peek_char() != '\n':
-                comment += self.__expect_char("comment content")
+            end = self.__buf.find('\n', self.__pos) # A single character find is a C memchr scan
+            comment = self.__advance(end if end != -1 else self.__len)
             return self.__token("COMMENT", comment)
         if c == '/' and nc == '*':
             self.__expect_char("multi line comment start")
-            comment = ""
-            while self.__can_read():
-                c = self.__expect_char("comment content")
-                if c == '*' and self.__peek_char() == '/':
-                    self.__expect_char("multi line comment end")
-                    break
-                comment += c
+            end = self.__buf.find("*/", self.__pos)
+            if end == -1:
+                self.__advance(self.__len) # Report the error at the end of the source
+                self.__error("Unterminated comment")
+            comment = self.__advance(end)
+            self.__advance(end + 2)
             return self.__token("COMMENT", comment)
         # Operators
-        if c == '+' and nc == '=': return self.__token("PLUSEQUAL", c + self.__next_char())
-        if c == '-' and nc == '=': return self.__token("MINUSEQUAL", c + self.__next_char())
-        if c == '*' and nc == '=': return self.__token("TIMESEQUAL", c + self.__next_char())
-        if c == '/' and nc == '=': return self.__token("DIVEQUAL", c + self.__next_char())
-        if c == '%' and nc == '=': return self.__token("MODEQUAL", c + self.__next_char())
-        if c == '^' and nc == '=': return self.__token("POWEQUAL", c + self.__next_char())
-        if c == '<' and nc == '=': return self.__token("LESSEQUAL", c + self.__next_char())
-        if c == '>' and nc == '=': return self.__token("GREATEREQUAL", c + self.__next_char())
-        if c == '!' and nc == '=': return self.__token("NOTEQUAL", c + self.__next_char())
-        if c == '=' and nc == '=': return self.__token("EQUAL", c + self.__next_char())
-        if c == '=' and nc == '>': return self.__token("RIGHTARROW", c + self.__next_char())
-        if c == '&' and nc == '&': return self.__token("AND", c + self.__next_char())
-        if c == '|' and nc == '|': return self.__token("OR", c + self.__next_char())
-        if c == '#' and nc == '{': return self.__token("HASHBRACE", c + self.__next_char())
-        if c == '.' and nc == '.': return self.__token("RANGE", c + self.__next_char())
-        if c == '+': return self.__token("PLUS", c)
-        if c == '-': return self.__token("MINUS", c)
-        if c == '*': return self.__token("MULTIPLY", c)
-        if c == '/': return self.__token("DIVIDE", c)
-        if c == '%': return self.__token("MODULO", c)
-        if c == '^': return self.__token("POWER", c)
-        if c == '<': return self.__token("LESS", c)
-        if c == '>': return self.__token("GREATER", c)
-        if c == '=': return self.__token("ASSIGNMENT", c)
-        if c == '!': return self.__token("NOT", c)
-        if c == '&': return self.__token("BITWISEAND", c)
-        if c == '|': return self.__token("BITWISEOR", c)
-        if c == '~': return self.__token("BITWISENOT", c)
-        if c == '?': return self.__token("QUESTIONMARK", c)
-        if c == '.': return self.__token("DOT", c)
-        if c == ',': return self.__token("COMMA", c)
-        if c == ':': return self.__token("COLON", c)
-        if c == ';': return self.__token("SEMICOLON", c)
-        if c == '{': return self.__token("LBRACE", c)
-        if c == '}': return self.__token("RBRACE", c)
+        name = TWO_CHAR_OPERATORS.get(c + nc)
+        if name is not None: return self.__token(name, c + self.__next_char())
+        name = ONE_CHAR_OPERATORS.get(c)
+        if name is not None: return self.__token(name, c)
+        # Parenthesis and brackets depend on the previous character
         if c == '(':
             if self.__is_end_of_expression(pc):
                 return self.__token("CALL", c) # Treat as a function call
             return self.__token("LPAREN", c) # Normal parenthesis
-        if c == ')': return self.__token("RPAREN", c)
         if c == '[':
             if self.__is_end_of_expression(pc):
                 return self.__token("INDEX", c) # Indexing
             return self.__token("LBRACKET", c) # Normal bracket
-        if c == ']': return self.__token("RBRACKET", c)
         self.__error("Unexpected character: " + c)
 
     def is_done(self):
@@ -323,7 +384,7 @@ class Lexer:
         bool
             True if the lexer is done, False otherwise.
         """
-        return not self.__can_read() or self.peek_token().name == "EOF"
+        return self.peek_token().name == "EOF"
 
     def reset_peek(self):
         """
@@ -356,17 +417,32 @@ class Lexer:
         Token
             The next token from the source.
         """
-        if self.__peeked_token is not None:
-            t = self.__peeked_token
-            self.reset_peek()
+        t = self.__peeked_token
+        if t is not None:
+            self.__peeked_token = None
             return t
-        else:
+        t = self.__read_token()
+        while not allow_comment and t.name == "COMMENT":
+            self.__prev_comment = t
             t = self.__read_token()
-            if not allow_comment and t.name == "COMMENT":
-                self.__prev_comment = t
-                return self.next_token(False)
-            self.__dprint("  " + str(t))
-            return t
+        if self.__debug: self.__dprint("  " + str(t))
+        return t
+
+    def tokenize_all(self) -> list[Token]:
+        """
+        Read all remaining tokens from the source.
+
+        Returns
+        -------
+        list[Token]
+            The tokens without comments, the last token is EOF.
+        """
+        tokens: list[Token] = []
+        while True:
+            t = self.next_token()
+            tokens.append(t)
+            if t.name == "EOF":
+                return tokens
 
     def prev_comment(self):
         return self.__prev_comment
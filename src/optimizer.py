@@ -0,0 +1,99 @@
+# Constant folding pass
+from .ast import AtomicNode, BinaryNode, BlockNode, IfNode, LambdaNode, ListNode, MapNode, Node, ProgramNode, SliceNode, TupleNode, UnaryNode
+from .atoms import ValueAtom
+from .evaluator import binary_operations
+
+def is_literal(expression: Node) -> bool:
+    return isinstance(expression, AtomicNode) and expression.type != "identifier"
+
+# Largest integer power, in bits, that is computed while folding
+MAX_POWER_BITS = 4096
+
+def small_power(base, exponent) -> bool:
+    """
+    Check if an integer power is small enough to compute at parse time.
+    Float powers are bounded by the float range, too large ones fail and are not folded.
+    """
+    if base.__class__ is not int or exponent.__class__ is not int:
+        return True
+    return exponent < 0 or abs(base) < 2 or exponent * base.bit_length() <= MAX_POWER_BITS
+
+def fold_binary(expression: BinaryNode) -> Node:
+    """
+    Replace a binary operation on two literals with its result.
+    Operations that fail are kept so the error is reported when they are evaluated.
+    """
+    left, right = expression.left, expression.right
+    if not (is_literal(left) and is_literal(right)):
+        return expression
+    operation = binary_operations.get((expression.operator, left.type, right.type))
+    if operation is None:
+        return expression
+    if expression.operator == "POWER" and not small_power(left.value, right.value):
+        return expression # Computed when, and only if, it is evaluated
+    try:
+        result = operation(ValueAtom(left.type, left.value), ValueAtom(right.type, right.value))
+    except Exception:
+        return expression
+    if result.type == "number" and result.value.__class__ not in (int, float):
+        return expression # e.g. a complex root of a negative number, kept as evaluated
+    return AtomicNode(result.type, result.value)
+
+def fold_unary(expression: UnaryNode) -> Node:
+    """
+    Replace a unary operation on a literal with its result.
+    """
+    rhs = expression.rhs
+    if expression.operator == "MINUS" and is_literal(rhs) and rhs.type == "number":
+        return AtomicNode("number", -rhs.value)
+    if expression.operator == "NOT" and is_literal(rhs) and rhs.type == "bool":
+        return AtomicNode("bool", not rhs.value)
+    return expression
+
+def fold_expression(expression: Node) -> Node:
+    """
+    Fold the constant sub-expressions of an expression, children first.
+    Returns the expression itself or the literal node that replaces it.
+    """
+    if isinstance(expression, (ProgramNode, BlockNode)):
+        expression.expressions = [fold_expression(e) for e in expression.expressions]
+    elif isinstance(expression, LambdaNode):
+        expression.body = fold_expression(expression.body)
+    elif isinstance(expression, BinaryNode):
+        op = expression.operator
+        if op == "ASSIGNMENT":
+            # The left hand side is a pattern and is kept as written
+            expression.right = fold_expression(expression.right)
+            return expression
+        expression.left = fold_expression(expression.left)
+        if op != "DOT": # The member name is not an expression
+            expression.right = fold_expression(expression.right)
+        return fold_binary(expression)
+    elif isinstance(expression, (TupleNode, ListNode)):
+        expression.elements = [fold_expression(e) for e in expression.elements]
+    elif isinstance(expression, MapNode):
+        for key, value in expression.pairs.items():
+            expression.pairs[key] = fold_expression(value)
+        expression.valueNodes = list(expression.pairs.values())
+    elif isinstance(expression, UnaryNode):
+        expression.rhs = fold_expression(expression.rhs)
+        return fold_unary(expression)
+    elif isinstance(expression, SliceNode):
+        if expression.start is not None: expression.start = fold_expression(expression.start)
+        if expression.end is not None: expression.end = fold_expression(expression.end)
+        if expression.step is not None: expression.step = fold_expression(expression.step)
+    elif isinstance(expression, IfNode):
+        expression.condition = fold_expression(expression.condition)
+        expression.ifBody = fold_expression(expression.ifBody)
+        expression.elseIfs = [(fold_expression(cond), fold_expression(body)) for cond, body in expression.elseIfs]
+        if expression.elseBody is not None:
+            expression.elseBody = fold_expression(expression.elseBody)
+    return expression
+
+# Optimizer function
+def fold_constants(program: ProgramNode) -> ProgramNode:
+    """
+    Fold operations on literals, e.g. `2 + 3 * 4`, into a single literal node
+    so they are computed once instead of every time they are evaluated.
+    """
+    return fold_expression(program)
@@ -1,6 +1,15 @@
 # Parser class
 from .lexer import Lexer, Token
-from .ast import AtomicNode, BinaryNode, BlockNode, IfNode, LambdaNode, ListNode, MapNode, Node, ProgramNode, SliceNode, TupleNode, UnaryNode
+from .ast import AtomicNode, BinaryNode, BlockNode, IfNode, LambdaNode, ListNode, MapNode, Node, ProgramNode, SliceNode, TupleNode, UnaryNode, make_atomic
+
+# Atomic node type of each literal token, the names are string constants so
+# every node shares the same interned type string
+ATOMIC_TYPES = {
+    'IDENTIFIER': "identifier",
+    'STRING': "string",
+    'NUMBER': "number",
+    'BOOL': "bool",
+}
 
 # Left associative infix operators binding powers
 precedence_left = {
@@ -38,11 +47,29 @@ class Parser:
     def __init__(self, lexer: Lexer, debug = False):
         self.lexer = lexer
         self.debug = debug
+        self.tokens: list[Token] = [] # All tokens of the source, ending with EOF
+        self.position = 0 # Index of the next token
+        self.literals: dict[tuple, AtomicNode] = {} # Literal nodes shared within one parse
+        # Parse function of each token that can start a primary expression
+        self.__primary_parsers = {
+            'IDENTIFIER': self.__parse_atomic,
+            'STRING': self.__parse_atomic,
+            'NUMBER': self.__parse_atomic,
+            'BOOL': self.__parse_atomic,
+            'KEYWORD': self.__parse_keyword,
+            'LPAREN': self.__parse_parenthesis,
+            'LBRACKET': self.__parse_list,
+            'HASHBRACE': self.__parse_hash_map,
+            'LBRACE': self.__parse_block,
+            'MINUS': self.__parse_unary,
+            'NOT': self.__parse_unary,
+        }
 
     # Helper functions
     def __dprint(self, *args):
         """
         Print debug messages.
+        Callers check `self.debug` first, so the message is only formatted when it is printed.
         """
         if self.debug:
             print(*args)
@@ -53,11 +80,26 @@ class Parser:
         """
         raise Exception(f"Semantic Error at {token.line}:{token.column}: {msg}")
 
+    def __peek_token(self) -> Token:
+        """
+        Get the next token without consuming it.
+        """
+        return self.tokens[self.position]
+
+    def __next_token(self) -> Token:
+        """
+        Consume and return the next token, the final EOF token is never consumed.
+        """
+        t = self.tokens[self.position]
+        if t.name != "EOF":
+            self.position += 1
+        return t
+
     def __expect(self, token_name: str):
         """
         Expect a token from the lexer.
         """
-        t = self.lexer.next_token()
+        t = self.__next_token()
         if t.name != token_name:
             raise Exception(f"Expected {token_name} but got {t.name}")
         return t
@@ -71,20 +113,20 @@ class Parser:
         If accept_trailing_delimiter is True, a trailing delimiter before the end delimiter is accepted.
         """
         expressions = []
-        nt = self.lexer.peek_token()
+        nt = self.__peek_token()
         while nt.name != end_delimiter:
             expressions.append(self.__parse_expression())
-            nt = self.lexer.peek_token()
+            nt = self.__peek_token()
             # Check for the delimiter after an expression
             if nt.name == delimiter:
-                self.lexer.next_token()
-                nt = self.lexer.peek_token()
+                self.__next_token()
+                nt = self.__peek_token()
                 # If a trailing delimiter is accepted and the end delimiter is next, break the loop
                 if accept_trailing_delimiter and nt.name == end_delimiter:
                     break
             elif nt.name != end_delimiter:
                 self.__error(f"Expected '{delimiter}' or '{end_delimiter}' but got '{nt.name}'", nt)
-        self.lexer.next_token() # Remove the end delimiter
+        self.__next_token() # Remove the end delimiter
         return expressions
 
     def __parse_expressions_until(self, end_delimiter: str) -> list[Node]:
@@ -93,11 +135,11 @@ class Parser:
         The expressions are ended with the given end delimiter.
         """
         expressions = []
-        nt = self.lexer.peek_token()
+        nt = self.__peek_token()
         while nt.name != end_delimiter:
             expressions.append(self.__parse_expression())
-            nt = self.lexer.peek_token()
-        self.lexer.next_token()
+            nt = self.__peek_token()
+        self.__next_token()
         return expressions
 
     def __ident_list_to_str(self, nodes: list[Node]) -> list[str]:
@@ -115,39 +157,62 @@ class Parser:
         """
         Parse a primary expression from the lexer.
         """
-        prev_comment = self.lexer.prev_comment()
-        t = self.lexer.next_token()
-        if t.name in ["IDENTIFIER", "STRING", "NUMBER", "BOOL"]:
-            value = AtomicNode(t.name.lower(), t.value)
-            nt = self.lexer.peek_token()
-            if nt.name == "RIGHTARROW":
-                return self.__parse_lambda([value])
-            else:
-                return value
-        elif t.name == "KEYWORD":
-            match t.value:
-                case "if": return self.__parse_if()
-                case _: raise Exception(f"Keyword '{t.value}' is not implemented!")
-        elif t.name == "LPAREN":
-            lhs = TupleNode(self.__parse_list_of_expressions("COMMA", "RPAREN", False))
-            # Check for trailing right arrow
-            nt = self.lexer.peek_token()
-            if nt.name == "RIGHTARROW":
-                return self.__parse_lambda(lhs.elements)
-            else:
-                if len(lhs.elements) == 1:
-                    lhs = lhs.elements[0]
-                return lhs
-        elif t.name == "LBRACKET":
-            return ListNode(self.__parse_list_of_expressions("COMMA", "RBRACKET", True))
-        elif t.name == "HASHBRACE":
-            return self.__parse_hash_map()
-        elif t.name == "LBRACE":
-            return BlockNode(self.__parse_expressions_until("RBRACE"))
-        elif t.name in ["MINUS", "NOT"]:
-            return UnaryNode(t.name, self.__parse_primary())
-        else:
+        t = self.__next_token()
+        parse = self.__primary_parsers.get(t.name)
+        if parse is None:
             self.__error(f"Expected primary expression but got '{t.name}'", t)
+        return parse(t)
+
+    def __parse_atomic(self, t: Token) -> Node:
+        """
+        Parse a literal or identifier, which may be the parameter of a lambda.
+        """
+        value = make_atomic(ATOMIC_TYPES[t.name], t.value, self.literals)
+        nt = self.__peek_token()
+        if nt.name == "RIGHTARROW":
+            return self.__parse_lambda([value])
+        else:
+            return value
+
+    def __parse_keyword(self, t: Token) -> Node:
+        """
+        Parse an expression starting with a keyword.
+        """
+        match t.value:
+            case "if": return self.__parse_if()
+            case _: raise Exception(f"Keyword '{t.value}' is not implemented!")
+
+    def __parse_parenthesis(self, t: Token) -> Node:
+        """
+        Parse a parenthesized expression, a tuple or the parameters of a lambda.
+        """
+        lhs = TupleNode(self.__parse_list_of_expressions("COMMA", "RPAREN", False))
+        # Check for trailing right arrow
+        nt = self.__peek_token()
+        if nt.name == "RIGHTARROW":
+            return self.__parse_lambda(lhs.elements)
+        else:
+            if len(lhs.elements) == 1:
+                lhs = lhs.elements[0]
+            return lhs
+
+    def __parse_list(self, t: Token) -> ListNode:
+        """
+        Parse a list literal.
+        """
+        return ListNode(self.__parse_list_of_expressions("COMMA", "RBRACKET", True))
+
+    def __parse_block(self, t: Token) -> BlockNode:
+        """
+        Parse a block of expressions.
+        """
+        return BlockNode(self.__parse_expressions_until("RBRACE"))
+
+    def __parse_unary(self, t: Token) -> UnaryNode:
+        """
+        Parse a unary operator and its operand.
+        """
+        return UnaryNode(t.name, self.__parse_primary())
 
     def __parse_lambda(self, args: list[Node]) -> LambdaNode:
         """
@@ -167,46 +232,49 @@ class Parser:
         Should only be called from within `__parse_binary_expression` itself.
         Ref: https://en.wikipedia.org/wiki/Operator-precedence_parser#Pratt_parsing
         """
-        l = self.lexer.peek_token().name
-        while (l in precedence_left and precedence_left[l] >= precedence):
-            op = self.lexer.next_token().name
+        tokens = self.tokens
+        # Binding power of the next token, -1 if it is not an infix operator
+        p = precedence_left.get(tokens[self.position].name, -1)
+        while p >= precedence:
+            op = self.__next_token().name
+            opPrecedence = p
             if op == "INDEX":
-                self.__dprint(f"Parsing indexing expression")
+                if self.debug: self.__dprint(f"Parsing indexing expression")
                 rhs = self.__parse_expression()
                 # Check if range index
-                if self.lexer.peek_token().name == "COLON":
-                    self.lexer.next_token()
+                if self.__peek_token().name == "COLON":
+                    self.__next_token()
                     end = self.__parse_expression()
                     step = None
-                    if self.lexer.peek_token().name == "COLON":
-                        self.lexer.next_token()
+                    if self.__peek_token().name == "COLON":
+                        self.__next_token()
                         step = self.__parse_expression()
                     rhs = SliceNode(rhs, end, step)
                 self.__expect("RBRACKET")
             elif op == 'CALL':
                 rhs = TupleNode(self.__parse_list_of_expressions("COMMA", "RPAREN", False))
-                # if self.lexer.peek_token().name == "ASSIGNMENT":
-                #     self.lexer.next_token() # Remove the assignment
+                # if self.__peek_token().name == "ASSIGNMENT":
+                #     self.__next_token() # Remove the assignment
                 #     rhs = self.__parse_expression()
                 #     # Convert args to list of strings
                 #     args = self.__ident_list_to_str(args)
                 #     return AssignmentNode(t.value, LambdaNode(args, rhs), prev_comment)
             else:
                 rhs = self.__parse_primary()
-            l = self.lexer.peek_token().name
-            while l in precedence_left and precedence_left[l] > precedence_left[op]:
-                rhs = self.__parse_binary_expression(rhs, precedence_left[l])
-                l = self.lexer.peek_token().name
+            p = precedence_left.get(tokens[self.position].name, -1)
+            while p > opPrecedence:
+                rhs = self.__parse_binary_expression(rhs, p)
+                p = precedence_left.get(tokens[self.position].name, -1)
             lhs = BinaryNode(op, lhs, rhs)
         return lhs
 
-    def __parse_hash_map(self) -> MapNode:
+    def __parse_hash_map(self, t: Token) -> MapNode:
         """
         Parse a hash map from the lexer.
         Example: { "key1" : "value1", key2 : "value2", 12 : "value3" }
         """
         pairs = {}
-        nt = self.lexer.peek_token()
+        nt = self.__peek_token()
         while nt.name != "RBRACE":
             key = self.__parse_primary()
             self.__expect("COLON")
@@ -214,12 +282,12 @@ class Parser:
             if key in pairs:
                 raise Exception(f"Duplicate key '{key}' in hash map!")
             pairs[key] = value
-            nt = self.lexer.peek_token()
+            nt = self.__peek_token()
             if nt.name == "COMMA":
-                self.lexer.next_token()
+                self.__next_token()
             elif nt.name != "RBRACE":
                 self.__error(f"Expected 'COMMA' or 'RBRACE' but got '{nt.name}'", nt)
-        self.lexer.next_token() # Remove the end delimiter
+        self.__next_token() # Remove the end delimiter
         return MapNode(pairs)
 
     def __parse_if(self) -> IfNode:
@@ -230,13 +298,13 @@ class Parser:
         ifBody = self.__parse_expression()
         elseIfs = []
         elseBody = None
-        nt = self.lexer.peek_token()
+        nt = self.__peek_token()
         while nt.name == "KEYWORD" and nt.value == "else":
-            self.lexer.next_token() # Remove the else keyword
+            self.__next_token() # Remove the else keyword
             # Peek and see if the next token is a chained if expression
-            nt = self.lexer.peek_token()
+            nt = self.__peek_token()
             if nt.name == "KEYWORD" and nt.value == "if":
-                self.lexer.next_token() # Remove the if keyword
+                self.__next_token() # Remove the if keyword
                 elseIfCond = self.__parse_expression()
                 elseIfBody = self.__parse_expression()
                 elseIfs.append((elseIfCond, elseIfBody))
@@ -255,8 +323,11 @@ class Parser:
         """
         Parse the source into an abstract syntax tree.
         """
+        self.tokens = self.lexer.tokenize_all()
+        self.position = 0
+        self.literals = {}
         program = ProgramNode([])
-        while not self.lexer.is_done():
+        while self.__peek_token().name != "EOF":
             e = self.__parse_expression()
             program.expressions.append(e)
         return program
@@ -0,0 +1,165 @@
+# Resolver pass
+from .ast import AtomicNode, BinaryNode, BlockNode, IfNode, LambdaNode, ListNode, MapNode, Node, ProgramNode, SliceNode, TupleNode, UnaryNode
+
+# Operators that set a variable in the current environment
+assignment_operators = frozenset(("ASSIGNMENT", "PLUSEQUAL", "MINUSEQUAL", "TIMESEQUAL", "DIVEQUAL", "MODEQUAL", "POWEQUAL"))
+
+class Scope():
+    """
+    A lexical scope, one for each environment the evaluator creates.
+    """
+    def __init__(self, parameters: dict[str, int] | None, assigned: set[str]):
+        """
+        Initialize a scope with the parameter slots of a function call
+        environment and the names that may be assigned in it.
+        """
+        self.parameters = parameters
+        self.assigned = assigned
+
+def function_declaration_parameters(expression: BinaryNode) -> list[str] | None:
+    """
+    Get the parameter names of a function declaration `f(a, b) = body`.
+    Returns None if the assignment is not a valid function declaration.
+    """
+    left = expression.left
+    if not (isinstance(left, BinaryNode) and left.operator == "CALL" and isinstance(left.right, TupleNode)):
+        return None
+    names: list[str] = []
+    for a in left.right.elements:
+        if not (isinstance(a, AtomicNode) and a.type == "identifier"):
+            return None
+        names.append(a.value)
+    return names
+
+def assigned_base(expression: Node) -> Node:
+    """
+    Get the node that an assignment stores into, e.g. `a` in `a.b[0] = 1`.
+    """
+    while isinstance(expression, BinaryNode) and expression.operator in ("DOT", "INDEX", "CALL"):
+        expression = expression.left
+    return expression
+
+def collect_assigned(expression: Node, names: set[str]):
+    """
+    Collect every name that evaluating the expression may set in the current environment.
+    Function bodies are not entered. Nested blocks are, even though they get environments
+    of their own, which can only mark more names as dynamic than necessary.
+    """
+    if isinstance(expression, (ProgramNode, BlockNode)):
+        for e in expression.expressions:
+            collect_assigned(e, names)
+    elif isinstance(expression, BinaryNode):
+        if expression.operator in assignment_operators:
+            base = assigned_base(expression.left)
+            if isinstance(base, AtomicNode) and base.type == "identifier":
+                names.add(base.value)
+            if expression.operator == "ASSIGNMENT" and function_declaration_parameters(expression) is not None:
+                return # The right hand side is the function body
+        collect_assigned(expression.left, names)
+        collect_assigned(expression.right, names)
+    elif isinstance(expression, (TupleNode, ListNode)):
+        for e in expression.elements:
+            collect_assigned(e, names)
+    elif isinstance(expression, MapNode):
+        for value in expression.pairs.values():
+            collect_assigned(value, names)
+    elif isinstance(expression, UnaryNode):
+        collect_assigned(expression.rhs, names)
+    elif isinstance(expression, SliceNode):
+        for e in (expression.start, expression.end, expression.step):
+            if e is not None: collect_assigned(e, names)
+    elif isinstance(expression, IfNode):
+        collect_assigned(expression.condition, names)
+        collect_assigned(expression.ifBody, names)
+        for cond, body in expression.elseIfs:
+            collect_assigned(cond, names)
+            collect_assigned(body, names)
+        if expression.elseBody is not None:
+            collect_assigned(expression.elseBody, names)
+
+def new_scope(expressions: list[Node], parameters: dict[str, int] | None = None) -> Scope:
+    assigned: set[str] = set()
+    for e in expressions:
+        collect_assigned(e, assigned)
+    return Scope(parameters, assigned)
+
+def resolve_identifier(expression: AtomicNode, scopes: list[Scope]):
+    """
+    Resolve an identifier to a parameter slot of an enclosing function call,
+    if no environment in between may define the same name.
+    """
+    name = expression.value
+    for depth, scope in enumerate(reversed(scopes)):
+        if name in scope.assigned:
+            return # Only known at runtime
+        if scope.parameters is not None and name in scope.parameters:
+            expression.depth = depth
+            expression.slot = scope.parameters[name]
+            return
+
+def resolve_function(parameters: list[str], body: Node, scopes: list[Scope]):
+    # A block body is evaluated directly in the call environment
+    expressions = body.expressions if isinstance(body, BlockNode) else [body]
+    indices = {name: i for i, name in enumerate(parameters)}
+    scopes.append(new_scope(expressions, indices))
+    for e in expressions:
+        resolve_expression(e, scopes)
+    scopes.pop()
+
+def resolve_expression(expression: Node, scopes: list[Scope]):
+    """
+    Resolve the identifiers in an expression.
+    """
+    if isinstance(expression, AtomicNode):
+        if expression.type == "identifier":
+            resolve_identifier(expression, scopes)
+    elif isinstance(expression, BlockNode):
+        scopes.append(new_scope(expression.expressions))
+        for e in expression.expressions:
+            resolve_expression(e, scopes)
+        scopes.pop()
+    elif isinstance(expression, LambdaNode):
+        resolve_function(expression.params, expression.body, scopes)
+    elif isinstance(expression, BinaryNode):
+        op = expression.operator
+        if op == "ASSIGNMENT":
+            # The left hand side is a pattern and is never evaluated as an expression
+            parameters = function_declaration_parameters(expression)
+            if parameters is not None:
+                resolve_function(parameters, expression.right, scopes)
+            else:
+                resolve_expression(expression.right, scopes)
+            return
+        resolve_expression(expression.left, scopes)
+        if op != "DOT": # The member name is not a variable
+            resolve_expression(expression.right, scopes)
+    elif isinstance(expression, (TupleNode, ListNode)):
+        for e in expression.elements:
+            resolve_expression(e, scopes)
+    elif isinstance(expression, MapNode):
+        for value in expression.pairs.values():
+            resolve_expression(value, scopes)
+    elif isinstance(expression, UnaryNode):
+        resolve_expression(expression.rhs, scopes)
+    elif isinstance(expression, SliceNode):
+        for e in (expression.start, expression.end, expression.step):
+            if e is not None: resolve_expression(e, scopes)
+    elif isinstance(expression, IfNode):
+        resolve_expression(expression.condition, scopes)
+        resolve_expression(expression.ifBody, scopes)
+        for cond, body in expression.elseIfs:
+            resolve_expression(cond, scopes)
+            resolve_expression(body, scopes)
+        if expression.elseBody is not None:
+            resolve_expression(expression.elseBody, scopes)
+
+# Resolver function
+def resolve(program: ProgramNode) -> ProgramNode:
+    """
+    Resolve the parameters of every function in a program to slots in the function call environment.
+    Identifiers that can not be resolved statically are looked up by name at runtime.
+    """
+    scopes = [new_scope(program.expressions)]
+    for e in program.expressions:
+        resolve_expression(e, scopes)
+    return program
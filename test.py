@@ -1,6 +1,7 @@
 from tests.util import done, set_crash_on_error
 from tests.map import run_all as run_all_map_tests
 from tests.lists import run_all as run_all_list_tests
+from tests.functions import run_all as run_all_function_tests
 from tests.std import run_all as run_all_std_tests
 from tests.examples import run_all as run_all_examples
 
@@ -12,6 +13,7 @@ def main():
     print("==================")
     passed &= run_all_map_tests()
     passed &= run_all_list_tests()
+    passed &= run_all_function_tests()
     passed &= run_all_std_tests()
     passed &= run_all_examples()
     done(passed)
@@ -0,0 +1,68 @@
+from .util import assert_eval, done, get_all_asserts_passed, new_test_suite, ValueAtom
+
+def test_parameters():
+    print("- Testing parameters...")
+    assert_eval("f(a, b) = a - b f(5, 3)", ValueAtom("number", 2))
+    assert_eval("f(a) = { { a } } f(5)", ValueAtom("number", 5))
+    assert_eval("f = (a, b) => a * b f(2, 3)", ValueAtom("number", 6))
+    assert_eval("fib(n) = if n < 2 { n } else { fib(n - 1) + fib(n - 2) } fib(10)", ValueAtom("number", 55))
+
+def test_parameter_shadowing():
+    print("- Testing parameter shadowing...")
+    assert_eval("f(a) = { a = a + 1 a } f(1)", ValueAtom("number", 2))
+    assert_eval("f(a) = { b = a { a = 2 } + b } f(1)", ValueAtom("number", 3))
+    assert_eval("f(a) = { g(a) = a * 2 g(a + 1) } f(1)", ValueAtom("number", 4))
+
+def test_closures():
+    print("- Testing closures...")
+    assert_eval("add(a) = b => a + b add(2)(3)", ValueAtom("number", 5))
+    assert_eval("f(a) = { g = () => a g() } f(7)", ValueAtom("number", 7))
+
+def test_shared_arguments():
+    print("- Testing arguments unpacked from a shared list...")
+    assert_eval("xs = [10, 20]\ng(a, b) = () => a\nh = g(tuple(xs))\nlist_reverse(xs)\nh()", ValueAtom("number", 10))
+    assert_eval("xs = [1, 2]\nf(a, b) = { list_reverse(xs) \n a }\nf(tuple(xs))", ValueAtom("number", 1))
+
+def test_short_circuit():
+    print("- Testing short circuit evaluation...")
+    assert_eval("false and undefined_function()", ValueAtom("bool", False))
+    assert_eval("true or undefined_function()", ValueAtom("bool", True))
+    assert_eval("true and false", ValueAtom("bool", False))
+    assert_eval("false or true", ValueAtom("bool", True))
+
+def test_constant_folding():
+    print("- Testing constant folding...")
+    assert_eval("2 + 3 * 4", ValueAtom("number", 14))
+    assert_eval("-(2 + 3)", ValueAtom("number", -5))
+    assert_eval("'a' + 1 + 2", ValueAtom("string", "a12"))
+    assert_eval("!(1 < 2)", ValueAtom("bool", False))
+    assert_eval("false and 1 / 0 == 1", ValueAtom("bool", False))
+    assert_eval("f(a) = a + 2 * 3 f(1)", ValueAtom("number", 7))
+
+def test_power_folding():
+    print("- Testing power folding...")
+    assert_eval("2 ^ 10", ValueAtom("number", 1024))
+    assert_eval("2 ^ -1", ValueAtom("number", 0.5))
+    # Too large to fold, so only computed if called
+    assert_eval("f() = 7 ^ (3 ^ 19)\n1", ValueAtom("number", 1))
+    # A complex result is not a literal, so it is not folded
+    assert_eval("f() = -8 ^ 0.5\n1", ValueAtom("number", 1))
+
+def test_signed_zero_folding():
+    print("- Testing signed zero folding...")
+    assert_eval("str(0 * 1.5) + str(0 * -1.5)", ValueAtom("string", "0.0-0.0"))
+
+def run_all() -> bool:
+    new_test_suite("function")
+    test_parameters()
+    test_parameter_shadowing()
+    test_closures()
+    test_shared_arguments()
+    test_short_circuit()
+    test_constant_folding()
+    test_power_folding()
+    test_signed_zero_folding()
+    return get_all_asserts_passed()
+
+if __name__ == "__main__":
+    done(run_all())
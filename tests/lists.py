@@ -25,12 +25,32 @@ def test_range_index():
     assert_eval("[1, 2, 3][1:3]", ValueAtom("list", [ValueAtom("number", 2), ValueAtom("number", 3)]))
     # assert_eval("[1, 2, 3][1:4]", ValueAtom("list", [ValueAtom("number", 2), ValueAtom("number", 3), ValueAtom("number", 4)]))
 
+def test_ranges():
+    print("- Testing ranges...")
+    assert_eval("0..3", ValueAtom("list", [ValueAtom("number", 0), ValueAtom("number", 1), ValueAtom("number", 2)]))
+    assert_eval("3..1", ValueAtom("list", []))
+    assert_eval("range(2)", ValueAtom("list", [ValueAtom("number", 0), ValueAtom("number", 1)]))
+    assert_eval("range(0, 5, 2)", ValueAtom("list", [ValueAtom("number", 0), ValueAtom("number", 2), ValueAtom("number", 4)]))
+    assert_eval("range(1020, 1026)[5]", ValueAtom("number", 1025))
+    assert_eval("range(10, 0, -4)", ValueAtom("list", [ValueAtom("number", 10), ValueAtom("number", 6), ValueAtom("number", 2)]))
+    assert_eval("(1020..1026)[5]", ValueAtom("number", 1025))
+
+def test_list_functions():
+    print("- Testing list functions...")
+    assert_eval("list_find([1, 2, 1, 3], 1)", ValueAtom("number", 0))
+    assert_eval("list_find_last([1, 2, 1, 3], 1)", ValueAtom("number", 2))
+    assert_eval("list_reduce([1, 2, 3], (a, b) => a + b)", ValueAtom("number", 6))
+    assert_eval("list_reduce([1, 2, 3], (a, b) => a + b, 10)", ValueAtom("number", 16))
+    assert_eval("list_group_by([1, 2, 3], x => x % 2)['1']", ValueAtom("list", [ValueAtom("number", 1), ValueAtom("number", 3)]))
+
 def run_all() -> bool:
     new_test_suite("list")
     test_create_list()
     test_index_access()
     test_index_assignment()
     test_range_index()
+    test_ranges()
+    test_list_functions()
     return get_all_asserts_passed()
 
 if __name__ == "__main__":
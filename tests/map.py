@@ -19,11 +19,23 @@ def test_member_assignment():
     print("- Testing member assignment...")
     assert_eval("m = #{a: 5} m.a = 6 m.a", ValueAtom("number", 6))
 
+def test_map_conversion():
+    print("- Testing map conversion...")
+    assert_eval("map([('a', 1), ('b', 2)])['b']", ValueAtom("number", 2))
+    assert_eval("map([5, 6])[1]", ValueAtom("number", 6))
+    assert_eval("map_contains(#{a: 5}, 'a')", ValueAtom("bool", True))
+    assert_eval("map_contains(#{a: 5}, 'b')", ValueAtom("bool", False))
+    assert_eval("m = #{a: 5, b: 6} map_remove(m, 'a') m", ValueAtom("map", {"b": ValueAtom("number", 6)}))
+    assert_eval("map_keys(#{a: 5, b: 6})", ValueAtom("list", [ValueAtom("string", "a"), ValueAtom("string", "b")]))
+    assert_eval("map_items(#{a: 5})", ValueAtom("list", [ValueAtom("tuple", [ValueAtom("string", "a"), ValueAtom("number", 5)])]))
+    assert_eval("map('{\"a\": [1, true]}')", ValueAtom("map", {"a": ValueAtom("list", [ValueAtom("number", 1), ValueAtom("bool", True)])}))
+
 def run_all() -> bool:
     new_test_suite("map")
     test_create_map()
     test_member_access()
     test_member_assignment()
+    test_map_conversion()
     return get_all_asserts_passed()
 
 if __name__ == "__main__":
@@ -13,9 +13,28 @@ def run_all() -> bool:
     print("(skipped)")
     print("- Testing system run function")
     assert_eval("system_run(\"echo Hello World\", true)", ValueAtom("unit", None))
+    assert_eval("system_run(\"\", true)", ValueAtom("unit", None))
+    assert_eval("str_trim(system_output(\"cd /\", true))", ValueAtom("string", ""))
     print("- Testing system output function")
     assert_eval("str_trim(system_output(\"echo Hello World\", true))", ValueAtom("string", "Hello World"))
+    print("- Testing system environment functions")
+    assert_eval("system_set_env(\"MINI_TEST\", \"abc\")\nsystem_get_envs()[\"MINI_TEST\"]", ValueAtom("string", "abc"))
     print("- Testing file read function")
+    print("- Testing string functions")
+    assert_eval("str_index_of(\"abcb\", \"b\")", ValueAtom("number", 1))
+    assert_eval("str_last_index_of(\"abcb\", \"b\")", ValueAtom("number", 3))
+    assert_eval("str_index_of(\"abc\", \"x\")", ValueAtom("number", -1))
+    print("- Testing math functions")
+    assert_eval("min(3, 2)", ValueAtom("number", 2))
+    assert_eval("max(3, 2)", ValueAtom("number", 3))
+    assert_eval("pow(2, 10)", ValueAtom("number", 1024))
+    assert_eval("pow(4, 0.5)", ValueAtom("number", 2.0))
+    print("- Testing utf-8 encoding functions")
+    assert_eval("dec_utf8(\"hé\")", ValueAtom("list", [ValueAtom("number", 104), ValueAtom("number", 195), ValueAtom("number", 169)]))
+    assert_eval("enc_utf8([104, 195, 169])", ValueAtom("string", "hé"))
+    print("- Testing base64 encoding functions")
+    assert_eval("enc_base64([104, 105, 33])", ValueAtom("string", "aGkh"))
+    assert_eval("dec_base64(\"aGkh\")", ValueAtom("list", [ValueAtom("number", 104), ValueAtom("number", 105), ValueAtom("number", 33)]))
 
     return get_all_asserts_passed()
 